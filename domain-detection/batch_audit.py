@@ -0,0 +1,283 @@
+"""多站点批量404检测
+
+一次检测多个域名/路径筛选（例如所有区域站点），所有站点共用：
+- 同一个HTTP连接池、链接检查线程池和按域名限速器
+- 同一个链接状态缓存：跨站点的相同链接（同一CDN、同一帮助中心）整批只检查一次
+
+站点按全局并发上限和单域名并发上限调度，每个站点生成自己的报告，最后再生成一份合并报告。
+
+批量配置文件（默认 batch_config.json）示例:
+    {
+        "sites": [
+            "www.example.com",
+            {"domain": "www.example.com", "preset": "au"},
+            {"domain": "www.example.com", "path_filter": ["/uk", "/ie"], "max_pages": 200}
+        ],
+        "max_concurrent_sites": 4,
+        "max_sites_per_host": 2,
+        "link_workers": 20,
+        "max_pages": 50,
+        "delay": 0.5
+    }
+sites 以外的键作为每个站点的默认爬虫配置（与 config.json 相同的键）。
+默认配置中的 checkpoint_path / metrics_path 会按站点名加后缀，每个站点各用一个文件；
+metrics_port 不能被多个站点共用，只能在单个站点的配置中指定。
+
+使用方法:
+    python batch_audit.py [batch_config.json] [--output-dir DIR]
+    python batch_audit.py --domains www.example.com --presets all au products
+"""
+import argparse
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from urllib.parse import urlparse
+
+from find_404_links import (
+    Link404Crawler, LinkStatusCache, HostRateLimiter, PATH_FILTER_PRESETS,
+    create_http_session, crawler_kwargs_from_config, load_config_from_file
+)
+
+logger = logging.getLogger(__name__)
+
+# 站点默认配置（与单站点配置文件的默认值一致）
+SITE_DEFAULTS = {
+    'max_pages': 50,
+    'max_workers': 5,
+    'delay': 1.0,
+    'path_filter': None,
+}
+
+# 按站点加后缀的文件路径配置：同时运行的站点不能写同一个文件
+SITE_FILE_KEYS = ('checkpoint_path', 'metrics_path')
+
+
+def build_sites(batch_config):
+    """把批量配置中的站点列表展开为完整的站点配置"""
+    defaults = dict(SITE_DEFAULTS)
+    defaults.update({k: v for k, v in batch_config.items()
+                     if k not in ('sites', 'max_concurrent_sites', 'max_sites_per_host', 'link_workers')})
+
+    if defaults.pop('metrics_port', None) is not None:
+        logger.warning("⚠️ 批量检测中多个站点不能共用 metrics_port，已忽略（可在单个站点的配置中指定）")
+
+    sites = []
+    metrics_ports = {}
+    for entry in batch_config.get('sites', []):
+        if isinstance(entry, str):
+            entry = {'domain': entry}
+        site = dict(defaults, **entry)
+        preset = site.pop('preset', None)
+        if preset and preset != 'all':
+            if preset not in PATH_FILTER_PRESETS:
+                raise ValueError(f"未知的路径筛选预设: {preset}（可选: {', '.join(PATH_FILTER_PRESETS)}）")
+            site['path_filter'] = PATH_FILTER_PRESETS[preset]
+        elif 'route' in site:
+            site['path_filter'] = site.pop('route')
+
+        label = site_label(site)
+        for key in SITE_FILE_KEYS:
+            if site.get(key) and key not in entry:
+                site[key] = site_file_path(site[key], label)
+        port = site.get('metrics_port')
+        if port is not None:
+            if port in metrics_ports:
+                raise ValueError(f"站点 {metrics_ports[port]} 和 {label} 使用了相同的 metrics_port: {port}")
+            metrics_ports[port] = label
+        sites.append(site)
+    return sites
+
+
+def site_file_path(path, label):
+    """在文件名（扩展名之前）加上站点名，例如 metrics.prom -> metrics_www_example_com_au.prom"""
+    root, ext = os.path.splitext(path)
+    return f"{root}_{label}{ext}"
+
+
+def site_label(site):
+    """站点的可读名称，同时用作报告目录名"""
+    domain = site['domain'].replace('://', '_').replace('.', '_').replace('/', '_')
+    path_filter = site.get('path_filter')
+    if not path_filter:
+        return domain
+    if isinstance(path_filter, list):
+        path_filter = '+'.join(path_filter)
+    return f"{domain}{path_filter.replace('/', '_')}"
+
+
+def site_host(site):
+    """站点所属的域名，用于单域名并发上限"""
+    domain = site['domain']
+    return urlparse(domain if '://' in domain else f"https://{domain}").netloc
+
+
+class BatchAuditRunner:
+    """批量检测调度器：在全局和单域名并发上限内同时运行多个站点"""
+
+    def __init__(self, sites, max_concurrent_sites=4, max_sites_per_host=2, link_workers=20,
+                 output_dir=None, rate_limit=None, adaptive_rate=True):
+        self.sites = sites
+        self.max_concurrent_sites = max(1, max_concurrent_sites)
+        self.max_sites_per_host = max(1, max_sites_per_host)
+        self.output_dir = output_dir or f"batch_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+        # 所有站点共用的资源
+        self.status_cache = LinkStatusCache()
+        self.link_executor = ThreadPoolExecutor(max_workers=link_workers)
+        self.rate_limiter = HostRateLimiter(rate_limit, adaptive=adaptive_rate) if rate_limit else None
+        pool_size = max(20, link_workers + self.max_concurrent_sites * 2)
+        self.session = create_http_session(pool_size, rate_limited=self.rate_limiter is not None)
+
+        self.results = []  # [(站点配置, 爬虫实例, 报告文件)]
+        self._lock = threading.Lock()
+
+    def run(self):
+        """运行所有站点，返回合并了全部结果的爬虫实例"""
+        logger.info(f"\n🚀 批量404检测: {len(self.sites)} 个站点, 最多同时 {self.max_concurrent_sites} 个, "
+                    f"同一域名最多 {self.max_sites_per_host} 个")
+        pending = list(self.sites)
+        running = {}  # future -> host
+        host_counts = {}
+
+        site_executor = ThreadPoolExecutor(max_workers=self.max_concurrent_sites)
+        try:
+            while pending or running:
+                # 按提交顺序启动满足并发上限的站点
+                for site in list(pending):
+                    if len(running) >= self.max_concurrent_sites:
+                        break
+                    host = site_host(site)
+                    if host_counts.get(host, 0) >= self.max_sites_per_host:
+                        continue
+                    pending.remove(site)
+                    host_counts[host] = host_counts.get(host, 0) + 1
+                    running[site_executor.submit(self._run_site, site)] = host
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host_counts[running.pop(future)] -= 1
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"站点检测失败: {e}")
+        finally:
+            site_executor.shutdown(wait=True)
+            self.link_executor.shutdown(wait=True)
+            self.session.close()
+
+        return self._merge()
+
+    def _run_site(self, site):
+        """检测单个站点并生成该站点的报告"""
+        label = site_label(site)
+        logger.info(f"\n🌐 开始检测站点: {label}")
+        crawler = Link404Crawler(
+            report_dir=os.path.join(self.output_dir, label),
+            status_cache=self.status_cache,
+            session=self.session,
+            link_executor=self.link_executor,
+            rate_limiter=self.rate_limiter,
+            checkpoint_path=site.get('checkpoint_path'),
+            checkpoint_interval=site.get('checkpoint_interval', 50),
+            resume=site.get('resume', False),
+            **crawler_kwargs_from_config(site)
+        )
+        with crawler:
+            crawler.crawl_for_404s()
+            crawler.print_final_summary()
+            files = {
+                'excel': crawler.save_results_to_excel(),
+                'html': crawler.generate_html_report(),
+                'json': crawler.save_json_report()
+            }
+        with self._lock:
+            self.results.append((site, crawler, files))
+        logger.info(f"✅ 站点完成: {label} - {len(crawler.visited_urls)} 页, {len(crawler.found_404s)} 个404")
+        return crawler
+
+    def _merge(self):
+        """把所有站点的结果合并到一个爬虫实例，用于生成合并报告"""
+        merged = Link404Crawler(domain='batch', report_dir=self.output_dir, use_status_cache=False)
+        for site, crawler, _ in sorted(self.results, key=lambda item: self.sites.index(item[0])):
+            merged.visited_urls.update(crawler.visited_urls)
+            merged.all_links.update(crawler.all_links)
+            merged.found_404s.extend(crawler.found_404s)
+            merged.page_link_details.extend(crawler.iter_page_details())
+            merged.redirect_chains.update(crawler.redirect_chains)
+            merged.pages_crawled += crawler.pages_crawled
+        return merged
+
+    def print_summary(self):
+        """打印每个站点的检测结果和共享缓存的效果"""
+        logger.info("\n" + "=" * 80)
+        logger.info("📊 批量检测汇总")
+        logger.info("=" * 80)
+        for site in self.sites:
+            for result_site, crawler, files in self.results:
+                if result_site is site:
+                    logger.info(f"  {site_label(site)}: {len(crawler.visited_urls)} 页, "
+                                f"{len(crawler.all_links)} 个链接, {len(crawler.found_404s)} 个404 -> {files['excel']}")
+                    break
+            else:
+                logger.info(f"  {site_label(site)}: 检测失败")
+        logger.info(f"🗃️ 共享状态缓存: {len(self.status_cache)} 个URL, 命中 {self.status_cache.hits} 次, "
+                    f"实际请求 {self.status_cache.misses} 次")
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='多站点批量404检测')
+    parser.add_argument('config', nargs='?', default='batch_config.json',
+                        help='批量配置文件（默认 batch_config.json）')
+    parser.add_argument('--domains', nargs='+', default=None,
+                        help='直接指定域名（不读取配置文件中的站点列表）')
+    parser.add_argument('--presets', nargs='+', default=None,
+                        help=f"与 --domains 组合的路径筛选预设: all {' '.join(PATH_FILTER_PRESETS)}")
+    parser.add_argument('--max-sites', type=int, default=None, help='最多同时检测的站点数')
+    parser.add_argument('--max-per-host', type=int, default=None, help='同一域名最多同时检测的站点数')
+    parser.add_argument('--output-dir', default=None, help='报告输出目录')
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    batch_config = load_config_from_file(args.config) or {}
+    if args.domains:
+        presets = args.presets or ['all']
+        batch_config['sites'] = [{'domain': domain, 'preset': preset}
+                                 for domain in args.domains for preset in presets]
+    sites = build_sites(batch_config)
+    if not sites:
+        print("❌ 没有需要检测的站点，请在配置文件的 sites 中列出，或使用 --domains")
+        return
+
+    runner = BatchAuditRunner(
+        sites,
+        max_concurrent_sites=args.max_sites or batch_config.get('max_concurrent_sites', 4),
+        max_sites_per_host=args.max_per_host or batch_config.get('max_sites_per_host', 2),
+        link_workers=batch_config.get('link_workers', 20),
+        output_dir=args.output_dir,
+        rate_limit=batch_config.get('rate_limit'),
+        adaptive_rate=batch_config.get('adaptive_rate', True)
+    )
+    with runner.run() as merged:
+        runner.print_summary()
+        print("\n💾 正在保存合并报告...")
+        excel_file = merged.save_results_to_excel()
+        html_file = merged.generate_html_report()
+        json_file = merged.save_json_report()
+
+        print(f"\n🎉 批量检测完成！各站点报告位于: {runner.output_dir}")
+        if excel_file:
+            print(f"📊 合并Excel报告: {excel_file}")
+        if html_file:
+            print(f"📄 合并HTML报告: {html_file}")
+        if json_file:
+            print(f"📋 合并JSON数据: {json_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,410 @@
+"""爬虫整体性能基准：在本机合成站点上运行 Link404Crawler
+
+在独立进程中启动一个本地HTTP服务器，按固定随机种子生成合成站点：
+- 可配置页面数、每页正文链接数、公共导航/页脚链接数、每页图片数
+- 按比例注入404链接、301重定向链接和慢响应页面，并可为所有响应加固定延迟
+每个测试方案（引擎/解析器/线程数）都在单独的子进程中运行，统计：
+页面/秒、请求/秒（服务器端计数）、峰值内存（RSS）、每页CPU时间，
+并校验找到的404链接与注入的404链接一致。
+
+结果可以保存为JSON，之后用 --compare 与基线对比，超出容差时以非零状态退出，
+用于离线比较引擎和发现性能回退。
+
+使用方法:
+    python benchmark_crawler.py [--pages 500] [--engines sync async] [--repeat 3]
+    python benchmark_crawler.py --save baseline.json
+    python benchmark_crawler.py --compare baseline.json [--tolerance 0.15]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.request import urlopen
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 合成站点默认参数
+SITE_DEFAULTS = {
+    'pages': 500,
+    'links_per_page': 20,
+    'nav_links': 30,
+    'footer_links': 10,
+    'images_per_page': 2,
+    'broken_ratio': 0.02,
+    'redirect_ratio': 0.02,
+    'slow_ratio': 0.02,
+    'slow_delay': 0.2,
+    'latency': 0.0,
+    'seed': 42,
+}
+
+
+class SyntheticSite:
+    """按种子确定生成的合成站点，同一参数每次生成的页面和链接完全相同"""
+
+    def __init__(self, pages=500, links_per_page=20, nav_links=30, footer_links=10, images_per_page=2,
+                 broken_ratio=0.02, redirect_ratio=0.02, slow_ratio=0.02, slow_delay=0.2,
+                 latency=0.0, seed=42):
+        self.pages = max(1, pages)
+        self.links_per_page = links_per_page
+        self.nav_links = min(nav_links, self.pages)
+        self.footer_links = min(footer_links, self.pages)
+        self.images_per_page = images_per_page
+        self.broken_ratio = broken_ratio
+        self.redirect_ratio = redirect_ratio
+        self.slow_ratio = slow_ratio
+        self.slow_delay = slow_delay
+        self.latency = latency
+        self.seed = seed
+
+    def page_links(self, index):
+        """返回页面的正文链接、图片链接以及该页是否为慢响应页面"""
+        rng = random.Random(f"{self.seed}-{index}")
+        # 第一个链接总是指向下一页，保证所有页面都能被爬到
+        links = [f"/p/{(index + 1) % self.pages}"]
+        for k in range(1, self.links_per_page):
+            roll = rng.random()
+            target = rng.randrange(self.pages)
+            if roll < self.broken_ratio:
+                links.append(f"/missing/{index}-{k}")
+            elif roll < self.broken_ratio + self.redirect_ratio:
+                links.append(f"/r/{target}")
+            else:
+                links.append(f"/p/{target}")
+        images = [f"/img/{index}-{k}.png" for k in range(self.images_per_page)]
+        return links, images, rng.random() < self.slow_ratio
+
+    def render_page(self, index):
+        links, images, _ = self.page_links(index)
+        nav = ''.join(f'<li class="nav-item"><a class="nav-link" href="/p/{k}">分类 {k}</a></li>'
+                      for k in range(self.nav_links))
+        footer = ''.join(f'<li><a href="/p/{self.pages - 1 - k}">页脚 {k}</a></li>'
+                         for k in range(self.footer_links))
+        cards = ''.join(
+            f'<div class="product-card"><a class="card-link" href="{link}">商品 {k}</a>'
+            f'<span class="price">${k}.00</span></div>'
+            for k, link in enumerate(links)
+        )
+        imgs = ''.join(f'<img class="product-image" src="{src}" alt="图片">' for src in images)
+        return (
+            f'<!DOCTYPE html><html><head><title>页面 {index}</title></head><body>'
+            f'<header class="site-header"><nav id="main-nav"><ul class="menu">{nav}</ul></nav></header>'
+            f'<main id="content" class="main-content"><h1>页面 {index}</h1>'
+            f'<section class="product-grid">{cards}</section><div class="gallery">{imgs}</div></main>'
+            f'<footer class="site-footer"><ul class="footer-links">{footer}</ul></footer>'
+            f'</body></html>'
+        ).encode('utf-8')
+
+    def expected_404s(self, page_indexes):
+        """给定已爬取的页面，返回其中注入的404链接路径"""
+        broken = set()
+        for index in page_indexes:
+            links, _, _ = self.page_links(index)
+            broken.update(link for link in links if link.startswith('/missing/'))
+        return broken
+
+
+def _serve_site(site_kwargs, ready_queue):
+    """在独立进程中运行合成站点服务器（避免服务器的CPU和内存计入爬虫）"""
+    site = SyntheticSite(**site_kwargs)
+    counts = {'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_HEAD(self):
+            self._respond(send_body=False)
+
+        def do_GET(self):
+            self._respond(send_body=True)
+
+        def _send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=None, send_body=True):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if send_body and body:
+                self.wfile.write(body)
+
+        def _respond(self, send_body):
+            path = self.path.split('?', 1)[0]
+            if path == '/__stats':
+                self._send(200, json.dumps(counts).encode('utf-8'), 'application/json', send_body=send_body)
+                return
+            with lock:
+                counts['requests'] += 1
+            if site.latency:
+                time.sleep(site.latency)
+
+            if path == '/' or path.startswith('/p/'):
+                try:
+                    index = int(path[3:]) if path.startswith('/p/') else 0
+                except ValueError:
+                    index = -1
+                if not 0 <= index < site.pages:
+                    self._send(404, b'not found', send_body=send_body)
+                    return
+                if site.page_links(index)[2]:
+                    time.sleep(site.slow_delay)
+                self._send(200, site.render_page(index), send_body=send_body)
+            elif path.startswith('/r/'):
+                self._send(301, headers={'Location': f"/p/{path[3:]}"}, send_body=send_body)
+            elif path.startswith('/img/'):
+                self._send(200, b'\x89PNG\r\n\x1a\n' + b'\0' * 256, 'image/png', send_body=send_body)
+            else:
+                self._send(404, b'not found', send_body=send_body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    ready_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def _server_requests(base_url):
+    with urlopen(f"{base_url}/__stats") as response:
+        return json.loads(response.read())['requests']
+
+
+def _resource_usage():
+    """返回 (CPU秒数, 峰值RSS字节)，包含已结束的子进程（解析进程池）"""
+    if resource is None:
+        return time.process_time(), None
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = self_usage.ru_utime + self_usage.ru_stime + child_usage.ru_utime + child_usage.ru_stime
+    # Linux 上 ru_maxrss 以KB为单位，macOS 上以字节为单位
+    peak_rss = self_usage.ru_maxrss if sys.platform == 'darwin' else self_usage.ru_maxrss * 1024
+    return cpu, peak_rss
+
+
+def _run_scenario(base_url, crawler_kwargs, with_reports, result_queue):
+    """子进程：运行一次爬虫并把统计结果放入队列"""
+    from find_404_links import Link404Crawler
+    logging.getLogger('find_404_links').setLevel(logging.WARNING)
+
+    try:
+        report_dir = tempfile.mkdtemp(prefix='find404_bench_') if with_reports else None
+        requests_before = _server_requests(base_url)
+        cpu_before, _ = _resource_usage()
+        started = time.perf_counter()
+        with Link404Crawler(base_url, report_dir=report_dir, **crawler_kwargs) as crawler:
+            crawler.crawl_for_404s()
+            if with_reports:
+                crawler.save_results_to_excel()
+                crawler.generate_html_report()
+                crawler.save_json_report()
+            elapsed = time.perf_counter() - started
+            cpu_after, peak_rss = _resource_usage()
+            visited = sorted(crawler.visited_urls)
+            found = sorted({record.url for record in crawler.found_404s})
+            pages = crawler.pages_crawled
+        result_queue.put({
+            'pages': pages,
+            'elapsed': elapsed,
+            'cpu': cpu_after - cpu_before,
+            'peak_rss': peak_rss,
+            'requests': _server_requests(base_url) - requests_before,
+            'visited': visited,
+            'found_404s': found,
+        })
+    except Exception as e:
+        result_queue.put({'error': repr(e)})
+
+
+def run_scenario(base_url, crawler_kwargs, with_reports=False, timeout=600):
+    """在单独的子进程中运行一个方案，峰值内存互不影响"""
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_scenario,
+                                      args=(base_url, crawler_kwargs, with_reports, result_queue))
+    process.start()
+    try:
+        result = result_queue.get(timeout=timeout)
+    finally:
+        process.join()
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result
+
+
+def _page_index(url):
+    """/p/N、/r/N 或站点首页对应的页面编号"""
+    path = url.split('://', 1)[-1].partition('/')[2].split('?', 1)[0]
+    if not path:
+        return 0
+    prefix, _, number = path.partition('/')
+    if prefix in ('p', 'r') and number.isdigit():
+        return int(number)
+    return None
+
+
+def summarize(name, site, runs):
+    """汇总同一方案的多次运行（取耗时中位数的那一次），并校验404结果"""
+    run = sorted(runs, key=lambda r: r['elapsed'])[len(runs) // 2]
+    pages = max(1, run['pages'])
+    indexes = {index for index in map(_page_index, run['visited']) if index is not None}
+    expected = site.expected_404s(indexes)
+    found = {url.split('://', 1)[-1].partition('/')[2] for url in run['found_404s']}
+    found = {f"/{path}" for path in found}
+    return {
+        'name': name,
+        'pages': run['pages'],
+        'elapsed': round(run['elapsed'], 3),
+        'pages_per_second': round(run['pages'] / run['elapsed'], 2),
+        'requests': run['requests'],
+        'requests_per_second': round(run['requests'] / run['elapsed'], 2),
+        'cpu_ms_per_page': round(run['cpu'] * 1000 / pages, 2),
+        'peak_rss_mb': round(run['peak_rss'] / 1024 / 1024, 1) if run['peak_rss'] else None,
+        'found_404s': len(found),
+        'expected_404s': len(expected),
+        'missed_404s': sorted(expected - found)[:10],
+        'unexpected_404s': sorted(found - expected)[:10],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """与基线对比：页面/秒下降或每页CPU/峰值内存上升超过容差视为回退"""
+    baseline = {item['name']: item for item in baseline.get('results', [])}
+    regressions = []
+    for item in results:
+        base = baseline.get(item['name'])
+        if not base:
+            continue
+        checks = [
+            ('pages_per_second', base['pages_per_second'], item['pages_per_second'], False),
+            ('cpu_ms_per_page', base['cpu_ms_per_page'], item['cpu_ms_per_page'], True),
+            ('peak_rss_mb', base.get('peak_rss_mb'), item.get('peak_rss_mb'), True),
+        ]
+        for metric, old, new, higher_is_worse in checks:
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            marker = ''
+            if (change > tolerance) if higher_is_worse else (change < -tolerance):
+                marker = ' ⚠️ 回退'
+                regressions.append((item['name'], metric, old, new))
+            print(f"  {item['name']:<24} {metric:<18} {old:>10} -> {new:<10} ({change:+.1%}){marker}")
+    return regressions
+
+
+def build_scenarios(args):
+    """按命令行参数组合出要运行的方案"""
+    scenarios = []
+    for engine in args.engines:
+        for parser in args.parsers:
+            for workers in args.workers:
+                name = f"{engine}/{parser}/w{workers}"
+                kwargs = {
+                    'max_pages': args.max_pages or args.pages,
+                    'delay': 0,
+                    'max_workers': workers,
+                    'engine': engine,
+                    'html_parser': parser,
+                    'parse_workers': args.parse_workers,
+                }
+                scenarios.append((name, kwargs))
+    return scenarios
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='爬虫整体性能基准（本机合成站点）')
+    site = parser.add_argument_group('合成站点')
+    site.add_argument('--pages', type=int, default=SITE_DEFAULTS['pages'], help='页面数')
+    site.add_argument('--links', type=int, default=SITE_DEFAULTS['links_per_page'], help='每页正文链接数')
+    site.add_argument('--nav', type=int, default=SITE_DEFAULTS['nav_links'], help='公共导航链接数')
+    site.add_argument('--footer', type=int, default=SITE_DEFAULTS['footer_links'], help='公共页脚链接数')
+    site.add_argument('--images', type=int, default=SITE_DEFAULTS['images_per_page'], help='每页图片数')
+    site.add_argument('--broken', type=float, default=SITE_DEFAULTS['broken_ratio'], help='404链接比例')
+    site.add_argument('--redirects', type=float, default=SITE_DEFAULTS['redirect_ratio'], help='301重定向链接比例')
+    site.add_argument('--slow', type=float, default=SITE_DEFAULTS['slow_ratio'], help='慢响应页面比例')
+    site.add_argument('--slow-delay', type=float, default=SITE_DEFAULTS['slow_delay'], help='慢响应页面的延迟（秒）')
+    site.add_argument('--latency', type=float, default=SITE_DEFAULTS['latency'], help='每个响应的固定延迟（秒）')
+    site.add_argument('--seed', type=int, default=SITE_DEFAULTS['seed'])
+
+    crawl = parser.add_argument_group('爬虫方案')
+    crawl.add_argument('--engines', nargs='+', default=['sync', 'async'], choices=['sync', 'async'])
+    crawl.add_argument('--parsers', nargs='+', default=['lxml'], choices=['lxml', 'html.parser'])
+    crawl.add_argument('--workers', type=int, nargs='+', default=[5], help='链接检查线程数（可给多个值对比）')
+    crawl.add_argument('--parse-workers', type=int, default=0, help='HTML解析进程数')
+    crawl.add_argument('--max-pages', type=int, default=None, help='最多爬取页面数（默认等于页面数）')
+    crawl.add_argument('--with-reports', action='store_true', help='同时计入生成 Excel/HTML/JSON 报告的开销')
+    crawl.add_argument('--repeat', type=int, default=1, help='每个方案运行次数（取耗时中位数）')
+
+    parser.add_argument('--save', default=None, help='把结果保存为JSON（可作为基线）')
+    parser.add_argument('--compare', default=None, help='与之前保存的基线JSON对比')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='回退判定的容差比例')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    site_kwargs = {
+        'pages': args.pages, 'links_per_page': args.links, 'nav_links': args.nav,
+        'footer_links': args.footer, 'images_per_page': args.images, 'broken_ratio': args.broken,
+        'redirect_ratio': args.redirects, 'slow_ratio': args.slow, 'slow_delay': args.slow_delay,
+        'latency': args.latency, 'seed': args.seed,
+    }
+    site = SyntheticSite(**site_kwargs)
+
+    ready_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve_site, args=(site_kwargs, ready_queue), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{ready_queue.get(timeout=30)}"
+    print(f"合成站点: {base_url} - {args.pages} 页, 每页 {args.links} 个正文链接 + "
+          f"{args.nav} 导航 + {args.footer} 页脚 + {args.images} 图片, "
+          f"404 {args.broken:.0%} / 重定向 {args.redirects:.0%} / 慢页面 {args.slow:.0%}")
+
+    results = []
+    try:
+        print(f"\n{'方案':<24} | {'页面':>6} | {'耗时':>8} | {'页面/秒':>8} | {'请求':>7} | "
+              f"{'请求/秒':>8} | {'CPU/页':>9} | {'峰值RSS':>8} | 404(找到/注入)")
+        print('-' * 118)
+        for name, kwargs in build_scenarios(args):
+            runs = [run_scenario(base_url, kwargs, args.with_reports) for _ in range(max(1, args.repeat))]
+            item = summarize(name, site, runs)
+            results.append(item)
+            rss = f"{item['peak_rss_mb']:.1f}MB" if item['peak_rss_mb'] is not None else 'N/A'
+            print(f"{name:<24} | {item['pages']:>6} | {item['elapsed']:>7.2f}s | {item['pages_per_second']:>8.1f} | "
+                  f"{item['requests']:>7} | {item['requests_per_second']:>8.1f} | {item['cpu_ms_per_page']:>7.2f}ms | "
+                  f"{rss:>8} | {item['found_404s']}/{item['expected_404s']}")
+            if item['missed_404s'] or item['unexpected_404s']:
+                print(f"  ⚠️ 404结果不一致: 漏报 {item['missed_404s']}, 误报 {item['unexpected_404s']}")
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'site': site_kwargs, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 结果已保存: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('site') != site_kwargs:
+            print("\n⚠️ 基线使用的合成站点参数不同，对比结果仅供参考")
+        print(f"\n📏 与基线对比 ({args.compare}, 容差 {args.tolerance:.0%}):")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ 发现 {len(regressions)} 项性能回退")
+            sys.exit(1)
+        print("\n✅ 未发现性能回退")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""爬取队列性能对比：deque 线性扫描 vs CrawlFrontier
+
+模拟爬取过程：每个页面发现若干链接，其中一部分是重复链接（页眉/页脚），
+对比原来 `link not in url_queue` 的写法与 CrawlFrontier 在不同规模下的耗时。
+
+使用方法: python benchmark_frontier.py [--sizes 10000 100000 1000000] [--legacy-limit 20000]
+"""
+import argparse
+import logging
+import time
+from collections import deque
+
+from find_404_links import CrawlFrontier
+
+logging.getLogger('find_404_links').setLevel(logging.WARNING)
+
+
+def generate_links(total, links_per_page=20, duplicate_ratio=0.5):
+    """按页面分批生成链接，每批中 duplicate_ratio 比例的链接是之前出现过的"""
+    batch = []
+    next_id = 0
+    for i in range(total * 2):
+        if next_id >= total:
+            break
+        if next_id and (i % 100) < duplicate_ratio * 100:
+            batch.append(f"https://shop.example.com/products/item-{(i * 7919) % next_id}")
+        else:
+            batch.append(f"https://shop.example.com/products/item-{next_id}")
+            next_id += 1
+        if len(batch) == links_per_page:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_legacy(total):
+    """原实现：deque + 线性成员判断"""
+    visited = set()
+    url_queue = deque()
+    start = time.perf_counter()
+    for batch in generate_links(total):
+        for link in batch:
+            if link not in visited and link not in url_queue:
+                url_queue.append(link)
+        # 每处理一批，模拟爬取一个页面
+        if url_queue:
+            visited.add(url_queue.popleft())
+    while url_queue:
+        visited.add(url_queue.popleft())
+    return time.perf_counter() - start, len(visited)
+
+
+def run_frontier(total, use_bloom=False, priority=False):
+    """CrawlFrontier：集合/布隆过滤器 + 分桶队列"""
+    visited = set()
+    frontier = CrawlFrontier(use_bloom=use_bloom, expected_urls=total)
+    start = time.perf_counter()
+    for batch in generate_links(total):
+        for link in batch:
+            if link not in visited:
+                frontier.append(link, len(link) % 4 if priority else 0)
+        if frontier:
+            visited.add(frontier.popleft())
+    while frontier:
+        visited.add(frontier.popleft())
+    return time.perf_counter() - start, len(visited)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='爬取队列性能对比')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--legacy-limit', type=int, default=20_000,
+                        help='超过此规模时跳过 deque 线性扫描（耗时为平方级）')
+    args = parser.parse_args()
+
+    print(f"{'URL数':>10} | {'deque扫描':>12} | {'Frontier(set)':>14} | {'Frontier+优先级':>16} | {'Frontier(bloom)':>16}")
+    print('-' * 82)
+    for size in args.sizes:
+        if size <= args.legacy_limit:
+            legacy_time, legacy_count = run_legacy(size)
+            legacy = f"{legacy_time:.3f}s"
+        else:
+            legacy = '跳过'
+        set_time, set_count = run_frontier(size)
+        prio_time, _ = run_frontier(size, priority=True)
+        bloom_time, bloom_count = run_frontier(size, use_bloom=True)
+        print(f"{size:>10} | {legacy:>12} | {set_time:>13.3f}s | {prio_time:>15.3f}s | {bloom_time:>15.3f}s")
+        if size <= args.legacy_limit and legacy_count != set_count:
+            print(f"  ⚠️ 结果不一致: deque={legacy_count}, frontier={set_count}")
+        if bloom_count != set_count:
+            print(f"  ℹ️ 布隆过滤器误判导致少入队 {set_count - bloom_count} 个URL")
+
+
+if __name__ == '__main__':
+    main()
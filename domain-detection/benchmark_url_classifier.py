@@ -0,0 +1,139 @@
+"""URL分类性能对比：原来的逐次解析实现 vs 预编译的 UrlClassifier
+
+生成模拟的链接流（站内页面、静态资源、外部链接、mailto/tel、大量重复的页眉/页脚链接），
+对每个URL依次执行 is_valid_url、is_static_resource、matches_path_filter，
+比较两种实现的耗时并校验结果一致。
+
+使用方法: python benchmark_url_classifier.py [--count 1000000] [--unique-ratio 0.3]
+"""
+import argparse
+import logging
+import random
+import time
+from urllib.parse import urlparse
+
+from find_404_links import Link404Crawler, UrlClassifier
+
+logging.getLogger('find_404_links').setLevel(logging.WARNING)
+
+BASE_URL = 'https://shop.example.com'
+PATH_FILTER = ['/au', '/products']
+
+
+class LegacyClassifier:
+    """原实现：每次调用都重新解析URL、遍历扩展名和路径模式"""
+
+    def __init__(self, base_url, static_extensions, path_filter):
+        self.base_url = base_url
+        self.static_extensions = static_extensions
+        self.path_filter = path_filter
+
+    def is_static_resource(self, url):
+        try:
+            path = urlparse(url).path.lower()
+            if any(path.endswith(ext) for ext in self.static_extensions):
+                return True
+            static_patterns = [
+                '/_next/static/', '/static/', '/assets/', '/public/',
+                '/dist/', '/build/', '/css/', '/js/', '/images/',
+                '/img/', '/fonts/', '/media/'
+            ]
+            return any(pattern in path for pattern in static_patterns)
+        except Exception:
+            return False
+
+    def is_valid_url(self, url):
+        try:
+            parsed = urlparse(url)
+            base_parsed = urlparse(self.base_url)
+            if parsed.netloc and parsed.netloc != base_parsed.netloc:
+                return False
+            if parsed.scheme in ['mailto', 'tel', 'javascript']:
+                return False
+            if url.startswith('#'):
+                return False
+            if self.is_static_resource(url):
+                return False
+            return True
+        except Exception:
+            return False
+
+    def matches_path_filter(self, url):
+        if not self.path_filter:
+            return True
+        path = urlparse(url).path
+        if isinstance(self.path_filter, list):
+            return any(path.startswith(filter_path) for filter_path in self.path_filter)
+        filter_path = self.path_filter
+        if not filter_path.startswith('/'):
+            filter_path = '/' + filter_path
+        return path.startswith(filter_path)
+
+
+def generate_urls(count, unique_ratio, seed=42):
+    """生成模拟链接：unique_ratio 比例为新URL，其余从页眉/页脚等常见链接中重复抽取"""
+    rng = random.Random(seed)
+    common = [f"{BASE_URL}/pages/nav-{i}" for i in range(200)]
+    common += [f"{BASE_URL}/cdn/shop/files/logo-{i}.png" for i in range(50)]
+    sections = ['/au/products', '/products', '/collections', '/blogs/news', '/pages', '/uk/products']
+    assets = ['.jpg', '.webp', '.css', '.js', '.svg', '.woff2', '.pdf']
+    urls = []
+    for i in range(count):
+        if rng.random() >= unique_ratio:
+            urls.append(rng.choice(common))
+            continue
+        kind = rng.random()
+        if kind < 0.6:
+            urls.append(f"{BASE_URL}{rng.choice(sections)}/item-{i}")
+        elif kind < 0.8:
+            urls.append(f"{BASE_URL}/cdn/shop/files/img-{i}{rng.choice(assets)}?v={i}")
+        elif kind < 0.9:
+            urls.append(f"{BASE_URL}/assets/bundle-{i}.min")
+        elif kind < 0.97:
+            urls.append(f"https://partner-{i % 40}.example.net/page-{i}")
+        else:
+            urls.append(rng.choice(['mailto:support@example.com', 'tel:+61000000', 'javascript:void(0)']))
+    return urls
+
+
+def run(classifier, urls):
+    """依次执行三种判断，返回耗时和结果"""
+    is_valid = classifier.is_valid_url
+    is_static = classifier.is_static_resource
+    matches = classifier.matches_path_filter
+    start = time.perf_counter()
+    results = [(is_valid(url), is_static(url), matches(url)) for url in urls]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='URL分类性能对比')
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--unique-ratio', type=float, default=0.3,
+                        help='新URL所占比例，其余为重复的页眉/页脚链接')
+    args = parser.parse_args()
+
+    static_extensions = Link404Crawler(BASE_URL).static_extensions
+    urls = generate_urls(args.count, args.unique_ratio)
+    print(f"URL数: {len(urls)}, 不重复: {len(set(urls))}")
+
+    legacy_time, legacy_results = run(LegacyClassifier(BASE_URL, static_extensions, PATH_FILTER), urls)
+    print(f"原实现:               {legacy_time:.2f}s")
+
+    classifier = UrlClassifier(BASE_URL, static_extensions, PATH_FILTER)
+    cold_time, new_results = run(classifier, urls)
+    print(f"UrlClassifier:        {cold_time:.2f}s ({legacy_time / cold_time:.1f}x)")
+
+    nocache = UrlClassifier(BASE_URL, static_extensions, PATH_FILTER, cache_size=0)
+    nocache_time, nocache_results = run(nocache, urls)
+    print(f"UrlClassifier(无LRU): {nocache_time:.2f}s ({legacy_time / nocache_time:.1f}x)")
+
+    if new_results != legacy_results or nocache_results != legacy_results:
+        mismatches = sum(1 for a, b in zip(legacy_results, new_results) if a != b)
+        print(f"  ⚠️ 结果不一致: {mismatches} 个URL")
+    else:
+        print("  ✅ 三种实现结果一致")
+
+
+if __name__ == '__main__':
+    main()
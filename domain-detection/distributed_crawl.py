@@ -0,0 +1,466 @@
+"""分布式404检测：协调者 + 多个工作进程/节点
+
+URL按哈希分片到各个工作者，所有工作者通过同一个中转存储（broker）共享爬取队列和结果：
+- sqlite:///路径  本机多进程，或多台机器共享同一个数据库文件
+- redis://主机:端口/库  多台机器，需要安装 redis；也可以传入任意兼容 Redis 接口的客户端对象
+
+协调者写入起始URL、启动本机工作进程、等待队列清空，最后把所有结果合并生成
+与单机模式相同的 Excel/HTML/JSON 报告。
+
+使用方法:
+    python distributed_crawl.py --workers 4                       # 本机4个工作进程
+    python distributed_crawl.py --workers 8 --local-workers 4 \\
+        --broker sqlite:////shared/crawl.db                        # 另外4个分片由其他节点处理
+    python distributed_crawl.py --broker sqlite:////shared/crawl.db \\
+        --workers 8 --worker-shard 5                               # 在其他节点上运行分片5
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import sqlite3
+import time
+import zlib
+
+from find_404_links import (
+    Link404Crawler, crawler_kwargs_from_config, get_user_config, record_to_json
+)
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for_url(url, num_shards):
+    """按URL哈希计算分片编号（各进程/节点结果一致）"""
+    return zlib.crc32(url.encode('utf-8')) % num_shards
+
+
+class SQLiteCrawlBroker:
+    """基于SQLite的共享爬取队列和结果存储
+
+    frontier 表以URL为主键完成全局去重；领取任务时在 BEGIN IMMEDIATE 事务中
+    把 pending 改为 claimed，多个进程同时领取也不会重复。领取后超过 claim_timeout
+    仍未完成的URL（工作者崩溃）会被重新领取。
+    """
+
+    def __init__(self, path, num_shards, max_pages=None, claim_timeout=600):
+        self.path = path
+        self.num_shards = num_shards
+        self.max_pages = max_pages
+        self.claim_timeout = claim_timeout
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            "url TEXT PRIMARY KEY, shard INTEGER NOT NULL, state TEXT NOT NULL, claimed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_shard_state ON frontier (shard, state)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (url TEXT PRIMARY KEY, payload TEXT NOT NULL)")
+
+    def reset(self):
+        """清空上一次运行留下的队列和结果"""
+        self._conn.execute("DELETE FROM frontier")
+        self._conn.execute("DELETE FROM results")
+
+    def push_urls(self, urls):
+        """把URL加入队列（已存在的URL忽略），返回新加入的数量"""
+        rows = [(url, shard_for_url(url, self.num_shards)) for url in urls]
+        if not rows:
+            return 0
+        before = self._conn.total_changes
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (url, shard, state) VALUES (?, ?, 'pending')", rows
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return self._conn.total_changes - before
+
+    def claim(self, shard, limit=1):
+        """领取本分片的待爬取URL；达到 max_pages 时返回空列表"""
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.max_pages is not None:
+                started = self._conn.execute(
+                    "SELECT COUNT(*) FROM frontier WHERE state != 'pending'"
+                ).fetchone()[0]
+                limit = min(limit, self.max_pages - started)
+            urls = []
+            if limit > 0:
+                urls = [row[0] for row in self._conn.execute(
+                    "SELECT url FROM frontier WHERE shard = ? AND "
+                    "(state = 'pending' OR (state = 'claimed' AND claimed_at < ?)) LIMIT ?",
+                    (shard, now - self.claim_timeout, limit)
+                )]
+                self._conn.executemany(
+                    "UPDATE frontier SET state = 'claimed', claimed_at = ? WHERE url = ?",
+                    [(now, url) for url in urls]
+                )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return urls
+
+    def complete(self, url, payload):
+        """保存页面结果并把URL标记为完成"""
+        data = json.dumps(payload, ensure_ascii=False, default=record_to_json)
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("INSERT OR REPLACE INTO results (url, payload) VALUES (?, ?)", (url, data))
+            self._conn.execute("UPDATE frontier SET state = 'done' WHERE url = ?", (url,))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def is_finished(self):
+        """队列中没有待爬取和处理中的URL（或已达到 max_pages 且全部完成）时返回True"""
+        counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+        if counts.get('claimed'):
+            return False
+        if self.max_pages is not None and counts.get('done', 0) >= self.max_pages:
+            return True
+        return not counts.get('pending')
+
+    def progress(self):
+        """返回 (已完成, 处理中, 待爬取) 数量"""
+        counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+        return counts.get('done', 0), counts.get('claimed', 0), counts.get('pending', 0)
+
+    def iter_results(self):
+        """按URL入队顺序产出 (页面URL, 结果)"""
+        cursor = self._conn.execute(
+            "SELECT results.url, results.payload FROM results "
+            "JOIN frontier ON frontier.url = results.url ORDER BY frontier.rowid"
+        )
+        for url, payload in cursor:
+            yield url, json.loads(payload)
+
+    def close(self):
+        self._conn.close()
+
+
+class RedisCrawlBroker:
+    """基于Redis的共享爬取队列和结果存储，适合多台机器
+
+    client 只需提供 sadd/rpush/lpop/llen/incr/decr/get/hset/hgetall/lrange/delete 方法，
+    因此可以用 redis-py 客户端，也可以用本地的兼容实现代替。
+    注意：Redis模式不会重新领取崩溃工作者未完成的URL。
+    """
+
+    def __init__(self, client, num_shards, max_pages=None, prefix='find404'):
+        self.client = client
+        self.num_shards = num_shards
+        self.max_pages = max_pages
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, num_shards, max_pages=None):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("使用 redis:// 中转存储需要先安装 redis: pip install redis")
+        return cls(redis.Redis.from_url(url, decode_responses=True), num_shards, max_pages)
+
+    def _key(self, *parts):
+        return ':'.join((self.prefix,) + tuple(str(p) for p in parts))
+
+    def reset(self):
+        keys = [self._key('seen'), self._key('started'), self._key('inflight'),
+                self._key('results'), self._key('order')]
+        keys.extend(self._key('queue', shard) for shard in range(self.num_shards))
+        self.client.delete(*keys)
+
+    def push_urls(self, urls):
+        added = 0
+        for url in urls:
+            if self.client.sadd(self._key('seen'), url):
+                self.client.rpush(self._key('queue', shard_for_url(url, self.num_shards)), url)
+                self.client.rpush(self._key('order'), url)
+                added += 1
+        return added
+
+    def claim(self, shard, limit=1):
+        urls = []
+        for _ in range(limit):
+            # 先占用页面名额和处理中计数，再出队，避免其他工作者误判队列已空
+            if self.max_pages is not None and int(self.client.incr(self._key('started'))) > self.max_pages:
+                self.client.decr(self._key('started'))
+                break
+            self.client.incr(self._key('inflight'))
+            url = self.client.lpop(self._key('queue', shard))
+            if url is None:
+                self.client.decr(self._key('inflight'))
+                if self.max_pages is not None:
+                    self.client.decr(self._key('started'))
+                break
+            urls.append(url)
+        return urls
+
+    def complete(self, url, payload):
+        data = json.dumps(payload, ensure_ascii=False, default=record_to_json)
+        self.client.hset(self._key('results'), url, data)
+        self.client.decr(self._key('inflight'))
+
+    def _pending(self):
+        return sum(int(self.client.llen(self._key('queue', shard))) for shard in range(self.num_shards))
+
+    def is_finished(self):
+        if int(self.client.get(self._key('inflight')) or 0) > 0:
+            return False
+        if self.max_pages is not None and int(self.client.get(self._key('started')) or 0) >= self.max_pages:
+            return True
+        return self._pending() == 0
+
+    def progress(self):
+        done = len(self.client.hgetall(self._key('results')))
+        return done, int(self.client.get(self._key('inflight')) or 0), self._pending()
+
+    def iter_results(self):
+        results = self.client.hgetall(self._key('results'))
+        for url in self.client.lrange(self._key('order'), 0, -1):
+            if url in results:
+                yield url, json.loads(results[url])
+
+    def close(self):
+        pass
+
+
+def create_broker(broker_url, num_shards, max_pages=None):
+    """根据地址创建中转存储：sqlite:///路径 或 redis://..."""
+    if broker_url.startswith('redis://') or broker_url.startswith('rediss://'):
+        return RedisCrawlBroker.from_url(broker_url, num_shards, max_pages)
+    if broker_url.startswith('sqlite:///'):
+        return SQLiteCrawlBroker(broker_url[len('sqlite:///'):], num_shards, max_pages)
+    raise ValueError(f"不支持的中转存储地址: {broker_url}")
+
+
+class DistributedCrawlWorker:
+    """分片工作者：只领取本分片的URL，爬取后把新链接和页面结果写回中转存储"""
+
+    def __init__(self, broker, shard, crawler_kwargs, batch_size=5, idle_sleep=0.5):
+        self.broker = broker
+        self.shard = shard
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        # 结果写入中转存储，工作者本地不保存断点和流式报告
+        crawler_kwargs = dict(crawler_kwargs, checkpoint_path=None, resume=False,
+                              stream_reports=False, use_sitemaps=False)
+        self.crawler = Link404Crawler(**crawler_kwargs)
+        # 重定向链保留在本地（后续页面的来源页面记录到同一条链），每页只上报有变化的链
+        self.crawler._redirect_updates = set()
+        self.pages_crawled = 0
+
+    def run(self):
+        """循环领取并爬取URL，直到全局队列清空"""
+        crawler = self.crawler
+        logger.info(f"👷 分片 {self.shard} 工作者启动")
+        try:
+            while True:
+                urls = self.broker.claim(self.shard, self.batch_size)
+                if not urls:
+                    if self.broker.is_finished():
+                        break
+                    time.sleep(self.idle_sleep)
+                    continue
+                for url in urls:
+                    self.broker.complete(url, self._crawl_one(url))
+                    if crawler.delay > 0 and crawler.rate_limiter is None:
+                        time.sleep(crawler.delay)
+        finally:
+            crawler.cleanup()
+        logger.info(f"👷 分片 {self.shard} 工作者结束，共爬取 {self.pages_crawled} 页")
+        return self.pages_crawled
+
+    def _crawl_one(self, url):
+        """爬取单个页面，返回可序列化的页面结果，并把新链接加入全局队列"""
+        crawler = self.crawler
+        crawler.visited_urls.add(url)
+        crawler.pages_crawled += 1
+        self.pages_crawled += 1
+
+        try:
+            links = crawler._crawl_page(url)
+        except Exception as e:
+            logger.error(f"爬取页面时出错 {url}: {e}")
+            links = None
+
+        payload = {
+            'links': sorted(links or ()),
+            'found_404s': list(crawler.found_404s),
+            'page_details': list(crawler.page_link_details),
+            # 增量检测：上次失效的链接本次的状态，协调者据此区分已修复和本次未遇到
+            'diff_observed': dict(crawler._diff_observed),
+            'redirect_chains': [
+                dict(crawler.redirect_chains[chain_url], parent_pages=list(crawler.redirect_chains[chain_url]['parent_pages']))
+                for chain_url in crawler._redirect_updates
+            ]
+        }
+        # 结果已交给中转存储，清空本地列表，内存不随页面数增长
+        crawler.found_404s.clear()
+        crawler.page_link_details.clear()
+        crawler._diff_observed.clear()
+        crawler._redirect_updates.clear()
+        crawler.all_links.clear()
+
+        if links is not None:
+            # 与单机模式 _enqueue_links 相同的规范化和路径筛选
+            self.broker.push_urls(
+                link for link in crawler._frontier_links(links)
+                if not crawler.path_filter or crawler.matches_path_filter(link)
+            )
+        return payload
+
+
+def _run_worker_process(broker_url, num_shards, shard, crawler_kwargs):
+    """工作进程入口"""
+    broker = create_broker(broker_url, num_shards, crawler_kwargs.get('max_pages'))
+    try:
+        DistributedCrawlWorker(broker, shard, crawler_kwargs).run()
+    finally:
+        broker.close()
+
+
+def run_coordinator(broker_url, num_shards, crawler_kwargs, local_workers=None, resume=False,
+                    poll_interval=2.0):
+    """协调者：写入起始URL、启动本机工作进程、等待完成后返回合并了全部结果的爬虫实例"""
+    broker = create_broker(broker_url, num_shards, crawler_kwargs.get('max_pages'))
+    merged = Link404Crawler(**dict(crawler_kwargs, checkpoint_path=None, resume=False, stream_reports=False))
+
+    try:
+        if not resume:
+            broker.reset()
+        start_url = merged._apply_path_filter_to_start_url(merged._get_start_url())
+        seeds = [start_url]
+        if merged.use_sitemaps:
+            seeds.extend(
+                url for url in merged.iter_sitemap_urls(merged.sitemap_urls or merged._discover_sitemaps())
+                if merged.is_valid_url(url) and (not merged.path_filter or merged.matches_path_filter(url))
+            )
+        # 与单机模式相同，队列中使用规范化后的URL
+        broker.push_urls(dict.fromkeys(map(merged._crawl_key, seeds)))
+
+        local_workers = num_shards if local_workers is None else local_workers
+        logger.info(f"\n🚀 分布式404检测: {num_shards} 个分片, 本机启动 {local_workers} 个工作进程")
+        logger.info(f"🗄️ 中转存储: {broker_url}")
+        logger.info(f"🎯 起始URL: {start_url}")
+
+        processes = [
+            multiprocessing.Process(
+                target=_run_worker_process,
+                args=(broker_url, num_shards, shard, crawler_kwargs),
+                name=f"find404-shard-{shard}"
+            )
+            for shard in range(local_workers)
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            while not broker.is_finished():
+                _check_worker_processes(processes)
+                done, in_flight, pending = broker.progress()
+                logger.info(f"📊 已完成 {done} 页, 处理中 {in_flight}, 待爬取 {pending}")
+                time.sleep(poll_interval)
+        except BaseException:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            raise
+        finally:
+            for process in processes:
+                process.join()
+
+        merge_results(merged, broker.iter_results())
+    finally:
+        broker.close()
+    return merged
+
+
+def _check_worker_processes(processes):
+    """本机工作进程异常退出时抛出 RuntimeError，避免协调者一直等待永远不会完成的分片"""
+    failed = [process for process in processes if process.exitcode not in (None, 0)]
+    if failed:
+        names = ', '.join(f"{process.name} (退出码 {process.exitcode})" for process in failed)
+        logger.error(f"❌ 工作进程异常退出: {names}")
+        raise RuntimeError(f"工作进程异常退出: {names}；可使用 --resume 继续爬取")
+
+
+def merge_results(crawler, results):
+    """把中转存储中的页面结果合并到爬虫实例，之后即可直接生成报告"""
+    for url, payload in results:
+        crawler.visited_urls.add(url)
+        crawler.pages_crawled += 1
+        crawler.all_links.update(payload['links'])
+        crawler.found_404s.extend(payload['found_404s'])
+        crawler.page_link_details.extend(payload['page_details'])
+        crawler._diff_observed.update(payload.get('diff_observed', {}))
+        for chain in payload.get('redirect_chains', ()):
+            # 同一条链可能由多个分片上报，合并来源页面
+            crawler.redirect_chains.setdefault(chain['url'], dict(chain, parent_pages=[]))
+            for parent_url in chain['parent_pages']:
+                crawler._note_redirect_parent(chain['url'], parent_url)
+    return crawler
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='分布式404链接检测')
+    parser.add_argument('--workers', type=int, required=True,
+                        help='分片（工作者）总数')
+    parser.add_argument('--local-workers', type=int, default=None,
+                        help='协调者在本机启动的工作进程数（默认等于分片总数）')
+    parser.add_argument('--broker', default=None,
+                        help='中转存储地址: sqlite:///路径 或 redis://主机:端口/库（默认按域名生成SQLite文件）')
+    parser.add_argument('--worker-shard', type=int, default=None,
+                        help='只作为工作者运行指定分片（用于其他节点）')
+    parser.add_argument('--resume', action='store_true',
+                        help='保留中转存储中已有的队列和结果继续爬取')
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    config = get_user_config()
+    if not config:
+        return
+
+    crawler_kwargs = crawler_kwargs_from_config(config)
+    broker_url = args.broker
+    if not broker_url:
+        domain_safe = config['domain'].replace('.', '_').replace('://', '_').replace('/', '_')
+        broker_url = f"sqlite:///crawl_broker_{domain_safe}.db"
+
+    if args.worker_shard is not None:
+        _run_worker_process(broker_url, args.workers, args.worker_shard, crawler_kwargs)
+        return
+
+    crawler = run_coordinator(broker_url, args.workers, crawler_kwargs,
+                              local_workers=args.local_workers, resume=args.resume)
+    with crawler:
+        crawler.print_final_summary()
+        print("\n💾 正在保存检测结果...")
+        excel_file = crawler.save_results_to_excel()
+        html_file = crawler.generate_html_report()
+        json_file = crawler.save_json_report()
+        diff_file = crawler.save_diff_report()
+
+        print("\n🎉 检测完成！生成的文件:")
+        if excel_file:
+            print(f"📊 Excel报告: {excel_file}")
+        if html_file:
+            print(f"📄 HTML报告: {html_file}")
+        if json_file:
+            print(f"📋 JSON数据: {json_file}")
+        if diff_file:
+            print(f"🆚 差异报告: {diff_file}")
+
+
+if __name__ == '__main__':
+    main()
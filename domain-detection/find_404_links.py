@@ -1,26 +1,1330 @@
 import requests
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
 import time
 import openpyxl
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
 from collections import deque
+import heapq
+import fnmatch
+import hashlib
+import zlib
+import math
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 import os
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, Future
 import threading
 import json
+import asyncio
+import sqlite3
+import argparse
+import sys
+from functools import lru_cache, wraps
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from email.utils import parsedate_to_datetime
+from xml.etree import ElementTree
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 日志模式：verbose 为原来的详细输出，quiet 只输出进度和汇总
+LOG_MODES = ('verbose', 'quiet')
+
+class LinkStatusCache:
+    """整个爬取过程共享的链接状态缓存（URL → 状态码 + 检查时间）
+    
+    同一URL只会真正请求一次；多个线程同时查询同一URL时，只有第一个线程发起请求，
+    其余线程等待并共享同一个结果。
+    """
+    
+    def __init__(self):
+        self._entries = {}  # url -> (status, checked_at)
+        self._pending = {}  # url -> Future
+        self._lock = threading.Lock()
+        self._change_log = None  # 开启变更记录后，按写入顺序记录URL（用于增量断点）
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, url):
+        return url in self._entries
+    
+    def get_entry(self, url):
+        """返回 (状态码, 检查时间戳)，未缓存时返回None"""
+        return self._entries.get(url)
+    
+    def peek(self, url):
+        """只查询已完成的缓存结果，不发起请求"""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry[0]
+    
+    def put(self, url, status, checked_at=None):
+        """写入检查结果"""
+        with self._lock:
+            self._entries[url] = (status, checked_at or time.time())
+            if self._change_log is not None:
+                self._change_log.append(url)
+    
+    def track_changes(self):
+        """开启变更记录，返回当前位置；之后可用 changes_since 取出新增/更新的条目"""
+        with self._lock:
+            if self._change_log is None:
+                self._change_log = []
+            return len(self._change_log)
+    
+    def changes_since(self, position):
+        """返回 (自 position 以来写入的条目, 新位置)"""
+        with self._lock:
+            log = self._change_log or []
+            changed = {url: list(self._entries[url]) for url in log[position:]}
+            return changed, len(log)
+    
+    def snapshot(self):
+        """导出缓存内容（用于断点保存）"""
+        with self._lock:
+            return {url: list(entry) for url, entry in self._entries.items()}
+    
+    def load(self, entries):
+        """从断点导入缓存内容"""
+        with self._lock:
+            for url, (status, checked_at) in entries.items():
+                self._entries[url] = (status, checked_at)
+    
+    def get_or_check(self, url, check_func):
+        """返回URL状态，必要时调用 check_func 检查；并发的相同请求会被合并"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            
+            future = self._pending.get(url)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._pending[url] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+        
+        if not is_owner:
+            return future.result()
+        
+        try:
+            status = check_func(url)
+        except Exception as e:
+            logger.error(f"检查URL {url} 时出错: {e}")
+            status = 'ERROR'
+        
+        with self._lock:
+            self._entries[url] = (status, time.time())
+            self._pending.pop(url, None)
+            if self._change_log is not None:
+                self._change_log.append(url)
+        future.set_result(status)
+        return status
+
+
+def normalize_url_key(url):
+    """生成用于缓存/持久化的URL键：协议和域名小写，去掉锚点"""
+    parsed = urlparse(url.strip())
+    return parsed._replace(
+        scheme=parsed.scheme.lower(),
+        netloc=parsed.netloc.lower(),
+        fragment=''
+    ).geturl()
+
+
+class PersistentStatusStore:
+    """基于SQLite的链接状态持久化存储，用于多次运行之间复用检查结果
+    
+    每条记录包含状态码、最后检查时间、ETag/Last-Modified 校验信息，发生重定向时还保存跳转链，
+    复用记录时据此恢复重定向报告。
+    在有效期(ttl)内的记录直接复用；过期但带校验信息的记录可用条件请求重新验证。
+    page_cache 表保存已爬取页面的校验信息、标题和提取出的链接，页面返回304时直接复用。
+    
+    每次写入立即提交（WAL模式），不长时间持有写锁：批量检测的多个站点、分布式的多个
+    工作进程可以同时打开同一个文件，遇到短暂的锁冲突时等待而不是报错。
+    """
+    
+    BUSY_TIMEOUT = 30  # 等待其他连接释放写锁的秒数
+    
+    def __init__(self, path, ttl=86400):
+        self.path = path
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, timeout=self.BUSY_TIMEOUT, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS link_status (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                checked_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                redirect_hops TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                links_hash TEXT NOT NULL,
+                links TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                title TEXT
+            )
+        """)
+        # 旧版本创建的数据库缺少后来增加的列
+        self._add_column('link_status', 'redirect_hops')
+        self._add_column('page_cache', 'title')
+        self._lock = threading.Lock()
+        
+        # 统计信息
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.fetched = 0
+    
+    def _add_column(self, table, column):
+        """为旧版本创建的表补上 TEXT 列"""
+        columns = {row[1] for row in self._conn.execute(f'PRAGMA table_info({table})')}
+        if column not in columns:
+            try:
+                self._conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} TEXT')
+            except sqlite3.OperationalError:
+                # 其他连接已同时添加
+                pass
+    
+    def get(self, url):
+        """读取记录，不存在时返回None；redirect_hops 为跳转链 [(URL, 状态码), ...] 或None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, checked_at, etag, last_modified, redirect_hops FROM link_status WHERE url = ?',
+                (normalize_url_key(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'status': row[0],
+            'checked_at': row[1],
+            'etag': row[2],
+            'last_modified': row[3],
+            'redirect_hops': [tuple(hop) for hop in json.loads(row[4])] if row[4] else None
+        }
+    
+    def count(self, name):
+        """增加统计计数（fresh_hits / revalidated / fetched）；链接检查线程并发调用"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+    
+    def is_fresh(self, entry, now=None):
+        """判断记录是否仍在有效期内"""
+        return (now or time.time()) - entry['checked_at'] < self.ttl
+    
+    def put(self, url, status, etag=None, last_modified=None, checked_at=None, redirect_hops=None):
+        """写入或更新记录"""
+        hops = json.dumps(redirect_hops, ensure_ascii=False) if redirect_hops else None
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO link_status (url, status, checked_at, etag, last_modified, redirect_hops) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (normalize_url_key(url), status, checked_at or time.time(), etag, last_modified, hops)
+            )
+    
+    def touch(self, url, checked_at=None):
+        """重新验证通过后刷新检查时间"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE link_status SET checked_at = ? WHERE url = ?',
+                (checked_at or time.time(), normalize_url_key(url))
+            )
+    
+    def get_page(self, url):
+        """读取页面缓存：校验信息、标题和上次提取的链接（URL → 位置信息）"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, links_hash, links, title FROM page_cache WHERE url = ?',
+                (normalize_url_key(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'links_hash': row[2],
+            'links': json.loads(row[3]),
+            'title': row[4]
+        }
+    
+    def put_page(self, url, etag, last_modified, links_hash, link_positions, title=None):
+        """保存页面缓存；链接集合未变化时只更新校验信息和标题"""
+        key = normalize_url_key(url)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT links_hash FROM page_cache WHERE url = ?', (key,)
+            ).fetchone()
+            if row is not None and row[0] == links_hash:
+                self._conn.execute(
+                    'UPDATE page_cache SET etag = ?, last_modified = ?, title = ?, checked_at = ? WHERE url = ?',
+                    (etag, last_modified, title, time.time(), key)
+                )
+            else:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO page_cache (url, etag, last_modified, links_hash, links, checked_at, title) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (key, etag, last_modified, links_hash,
+                     json.dumps(link_positions, ensure_ascii=False), time.time(), title)
+                )
+    
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            self._conn.close()
+
+
+class PreviousRunBaseline:
+    """上一次运行的检测结果，用于增量（差异）检测
+    
+    来源可以是 save_json_report 生成的JSON报告，也可以是持久化存储（SQLite）。
+    上次正常（2xx/3xx）的链接直接复用状态，不再请求；上次失效的链接和新发现的链接才会检查。
+    复用的链接上次发生过重定向时，同时复用上次的跳转链。
+    """
+    
+    def __init__(self, path, ok_statuses, broken, redirects=None):
+        self.path = path
+        self.ok_statuses = ok_statuses  # URL键 → 上次的状态码
+        self.broken = broken            # URL键 → {'url', 'parent_pages'}
+        self.redirects = redirects or {}  # URL键 → 跳转链 [(URL, 状态码), ...]
+        self.reused = 0
+    
+    @staticmethod
+    def _is_ok(status):
+        return isinstance(status, int) and 200 <= status < 400
+    
+    @classmethod
+    def load(cls, path):
+        """按文件类型读取：.json 为JSON报告，其他视为持久化存储数据库"""
+        if path.lower().endswith('.json'):
+            return cls.from_json_report(path)
+        return cls.from_status_store(path)
+    
+    @classmethod
+    def from_json_report(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        ok_statuses = {}
+        broken = {}
+        
+        def add_broken(url, parent_page):
+            entry = broken.setdefault(normalize_url_key(url), {'url': url, 'parent_pages': []})
+            if parent_page and parent_page not in entry['parent_pages']:
+                entry['parent_pages'].append(parent_page)
+        
+        for page_detail in data.get('page_details', []):
+            ok_statuses[normalize_url_key(page_detail['page_url'])] = 200
+            for link_status in page_detail.get('links_status', []):
+                status = link_status.get('status_code')
+                if cls._is_ok(status):
+                    ok_statuses[normalize_url_key(link_status['link_url'])] = status
+                elif status == 404:
+                    add_broken(link_status['link_url'], link_status.get('parent_page'))
+        for record in data.get('found_404s', []):
+            add_broken(record['url'], record.get('parent_page'))
+        
+        for key in broken:
+            ok_statuses.pop(key, None)
+        redirects = {
+            normalize_url_key(chain['url']): [(hop['url'], hop['status_code']) for hop in chain['hops']]
+            for chain in data.get('redirect_chains', [])
+        }
+        return cls(path, ok_statuses, broken, redirects)
+    
+    @classmethod
+    def from_status_store(cls, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        # 只读打开，与本次运行使用的持久化存储互不影响
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(link_status)')}
+            hops_column = 'redirect_hops' if 'redirect_hops' in columns else 'NULL'
+            rows = conn.execute(f'SELECT url, status, {hops_column} FROM link_status').fetchall()
+        finally:
+            conn.close()
+        
+        ok_statuses = {}
+        broken = {}
+        redirects = {}
+        for url, status, hops in rows:
+            if cls._is_ok(status):
+                ok_statuses[url] = status
+                if hops:
+                    redirects[url] = [tuple(hop) for hop in json.loads(hops)]
+            elif status == 404:
+                broken[url] = {'url': url, 'parent_pages': []}
+        return cls(path, ok_statuses, broken, redirects)
+    
+    def ok_status(self, url):
+        """上次正常时返回上次的状态码，否则返回None"""
+        return self.ok_statuses.get(normalize_url_key(url))
+    
+    def redirect_hops(self, url):
+        """上次的跳转链，没有重定向时返回None"""
+        return self.redirects.get(normalize_url_key(url))
+    
+    def was_broken(self, url):
+        return normalize_url_key(url) in self.broken
+
+
+class BloomFilter:
+    """简单的布隆过滤器，用于超大规模爬取时以少量误判换取内存占用"""
+    
+    def __init__(self, expected_items=1_000_000, false_positive_rate=0.001):
+        expected_items = max(1, expected_items)
+        self.size = max(8, int(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / expected_items * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+    
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+    
+    def add(self, item):
+        """添加元素，元素此前（可能）已存在时返回False"""
+        added = False
+        for pos in self._positions(item):
+            byte_index, mask = pos >> 3, 1 << (pos & 7)
+            if not self._bits[byte_index] & mask:
+                self._bits[byte_index] |= mask
+                added = True
+        if added:
+            self._count += 1
+        return added
+    
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+    
+    def __len__(self):
+        return self._count
+
+
+class CrawlFrontier:
+    """爬取队列：按优先级分桶的FIFO队列 + 已入队集合
+    
+    入队、出队和成员判断都是常数时间（只有出现新的优先级时才操作堆）。
+    优先级数值越小越先爬取，同一优先级内保持先进先出。
+    use_bloom=True 时用布隆过滤器记录已入队URL，内存占用固定，但极少数URL可能被误判为已入队。
+    """
+    
+    def __init__(self, urls=(), use_bloom=False, expected_urls=1_000_000):
+        self._buckets = {}  # priority -> deque
+        self._priorities = []  # 非空桶的优先级堆
+        self._size = 0
+        self._seen = BloomFilter(expected_urls) if use_bloom else set()
+        for url in urls:
+            self.append(url)
+    
+    def append(self, url, priority=0):
+        """URL未入队过时加入队列并返回True，否则返回False"""
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        
+        bucket = self._buckets.get(priority)
+        if bucket is None:
+            bucket = self._buckets[priority] = deque()
+            heapq.heappush(self._priorities, priority)
+        bucket.append(url)
+        self._size += 1
+        return True
+    
+    def extend(self, urls, priority_func=None):
+        """批量加入URL（可以是生成器），返回实际入队的数量"""
+        append = self.append
+        added = 0
+        if priority_func is None:
+            for url in urls:
+                added += append(url)
+        else:
+            for url in urls:
+                added += append(url, priority_func(url))
+        return added
+    
+    def mark_seen(self, url):
+        """只记录URL已处理过，不加入队列"""
+        self._seen.add(url)
+    
+    def popleft(self):
+        """取出优先级最高的URL"""
+        if not self._size:
+            raise IndexError('pop from an empty frontier')
+        priority = self._priorities[0]
+        bucket = self._buckets[priority]
+        url = bucket.popleft()
+        if not bucket:
+            heapq.heappop(self._priorities)
+            del self._buckets[priority]
+        self._size -= 1
+        return url
+    
+    def __contains__(self, url):
+        return url in self._seen
+    
+    def __len__(self):
+        return self._size
+    
+    def __iter__(self):
+        """按出队顺序遍历待爬取的URL"""
+        for priority in sorted(self._buckets):
+            yield from self._buckets[priority]
+
+
+class CrawlMetrics:
+    """爬取过程的运行指标：各阶段耗时直方图、按状态码统计的请求数、下载字节数和各种实时数值
+    
+    阶段: fetch(请求到收到响应头) / download(读取正文) / parse / extract / link_check(每页链接检查) / report
+    所有方法线程安全，开销只有一次加锁和几次加法。
+    """
+    
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+    
+    class _Histogram:
+        __slots__ = ('counts', 'count', 'total', 'max')
+        
+        def __init__(self, size):
+            self.counts = [0] * size
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self._histograms = {}
+        self.requests = {}  # (method, status) -> 次数
+        self.bytes_downloaded = 0
+        self.gauges = {}
+    
+    def observe(self, phase, seconds):
+        """记录一次阶段耗时"""
+        index = 0
+        while seconds > self.BUCKETS[index]:
+            index += 1
+        with self._lock:
+            histogram = self._histograms.get(phase)
+            if histogram is None:
+                histogram = self._histograms[phase] = self._Histogram(len(self.BUCKETS))
+            histogram.counts[index] += 1
+            histogram.count += 1
+            histogram.total += seconds
+            if seconds > histogram.max:
+                histogram.max = seconds
+    
+    def timer(self, phase):
+        """上下文管理器：把代码块的耗时计入指定阶段"""
+        return _PhaseTimer(self, phase)
+    
+    def record_request(self, method, status, seconds):
+        """记录一次HTTP请求（耗时计入 request 阶段）"""
+        self.observe('request', seconds)
+        key = (method, str(status))
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+    
+    def add_bytes(self, size):
+        with self._lock:
+            self.bytes_downloaded += size
+    
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+    
+    def add_gauge(self, name, delta):
+        with self._lock:
+            self.gauges[name] = self.gauges.get(name, 0) + delta
+    
+    def _quantile(self, histogram, q):
+        """按分桶估算分位数（返回所在分桶的上界）"""
+        target = q * histogram.count
+        cumulative = 0
+        for bound, count in zip(self.BUCKETS, histogram.counts):
+            cumulative += count
+            if cumulative >= target:
+                return histogram.max if bound == float('inf') else min(bound, histogram.max)
+        return histogram.max
+    
+    def snapshot(self):
+        """导出当前指标（可直接序列化为JSON）"""
+        with self._lock:
+            phases = {
+                phase: {
+                    'count': h.count,
+                    'total_seconds': round(h.total, 4),
+                    'avg_seconds': round(h.total / h.count, 4) if h.count else 0,
+                    'p50_seconds': round(self._quantile(h, 0.5), 4),
+                    'p95_seconds': round(self._quantile(h, 0.95), 4),
+                    'max_seconds': round(h.max, 4),
+                    'buckets': {('+Inf' if b == float('inf') else str(b)): c for b, c in zip(self.BUCKETS, h.counts)}
+                }
+                for phase, h in self._histograms.items()
+            }
+            requests_by_status = {f"{method} {status}": count for (method, status), count in sorted(self.requests.items())}
+            requests_total = sum(self.requests.values())
+            gauges = dict(self.gauges)
+            bytes_downloaded = self.bytes_downloaded
+        
+        uptime = time.time() - self.started_at
+        pool_size = gauges.get('link_pool_size')
+        if pool_size:
+            gauges['link_pool_utilization'] = round(gauges.get('link_checks_active', 0) / pool_size, 3)
+        return {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'uptime_seconds': round(uptime, 1),
+            'pages_per_second': round(gauges.get('pages_crawled', 0) / uptime, 3) if uptime else 0,
+            'phases': phases,
+            'requests': requests_by_status,
+            'requests_total': requests_total,
+            'bytes_downloaded': bytes_downloaded,
+            'gauges': gauges
+        }
+    
+    def to_prometheus(self, prefix='find404'):
+        """导出 Prometheus 文本格式"""
+        lines = [f"# TYPE {prefix}_phase_seconds histogram"]
+        with self._lock:
+            for phase, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.BUCKETS, h.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{prefix}_phase_seconds_bucket{{phase="{phase}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_phase_seconds_sum{{phase="{phase}"}} {h.total:.6f}')
+                lines.append(f'{prefix}_phase_seconds_count{{phase="{phase}"}} {h.count}')
+            lines.append(f"# TYPE {prefix}_requests_total counter")
+            for (method, status), count in sorted(self.requests.items()):
+                lines.append(f'{prefix}_requests_total{{method="{method}",status="{status}"}} {count}')
+            lines.append(f"# TYPE {prefix}_bytes_downloaded_total counter")
+            lines.append(f"{prefix}_bytes_downloaded_total {self.bytes_downloaded}")
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class _PhaseTimer:
+    """CrawlMetrics.timer 返回的计时器"""
+    __slots__ = ('metrics', 'phase', 'started')
+    
+    def __init__(self, metrics, phase):
+        self.metrics = metrics
+        self.phase = phase
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metrics.observe(self.phase, time.perf_counter() - self.started)
+
+
+def timed_phase(phase):
+    """方法装饰器：把方法耗时计入 self.metrics 的指定阶段"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(phase):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsExporter:
+    """定期把指标快照写入JSON文件，并可选地在本机端口提供 /metrics（Prometheus文本）和 /metrics.json"""
+    
+    def __init__(self, metrics, path=None, interval=10, port=None):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.port = port
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+        self._started = False
+    
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        if self.path:
+            self._thread = threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True)
+            self._thread.start()
+        if self.port is not None:
+            metrics = self.metrics
+            
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.startswith('/metrics.json'):
+                        body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode('utf-8')
+                        content_type = 'application/json; charset=utf-8'
+                    elif self.path.startswith('/metrics'):
+                        body = metrics.to_prometheus().encode('utf-8')
+                        content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                    else:
+                        self.send_response(404)
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                
+                def log_message(self, format, *args):
+                    pass
+            
+            self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+            logger.info(f"📈 指标地址: http://127.0.0.1:{self.port}/metrics")
+    
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write_snapshot()
+    
+    def write_snapshot(self):
+        """原子地写入一次指标快照"""
+        if not self.path:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.metrics.snapshot(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"写入指标快照失败: {e}")
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write_snapshot()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class CrawlProgress:
+    """精简模式下的爬取进度：终端中显示单行进度条，否则每隔若干页输出一行进度日志"""
+    
+    BAR_WIDTH = 30
+    
+    def __init__(self, total, every=50, stream=None):
+        self.total = max(1, total)
+        self.every = max(1, every)
+        self.stream = stream if stream is not None else sys.stderr
+        self.use_bar = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        self.started = time.monotonic()
+        self._last_draw = 0.0
+        self._drawn = False
+        self._lock = threading.Lock()
+    
+    def update(self, pages, found_404s, queue_depth, current_url=None):
+        now = time.monotonic()
+        rate = pages / max(now - self.started, 1e-6)
+        with self._lock:
+            if self.use_bar:
+                # 限制刷新频率，进度条本身不应成为开销
+                if now - self._last_draw < 0.2 and pages < self.total:
+                    return
+                self._last_draw = now
+                filled = int(self.BAR_WIDTH * min(pages, self.total) / self.total)
+                self.stream.write(
+                    f"\r[{'#' * filled}{'-' * (self.BAR_WIDTH - filled)}] {pages}/{self.total} 页 | "
+                    f"404: {found_404s} | 队列: {queue_depth} | {rate:.1f} 页/秒 "
+                )
+                self.stream.flush()
+                self._drawn = True
+            elif pages % self.every == 0 or pages == self.total:
+                logger.info("📈 进度 %d/%d 页 (%.0f%%) | 404: %d | 队列: %d | %.1f 页/秒 | 当前: %s",
+                            pages, self.total, pages * 100 / self.total, found_404s, queue_depth, rate, current_url)
+    
+    def finish(self):
+        with self._lock:
+            if self._drawn:
+                self.stream.write('\n')
+                self.stream.flush()
+                self._drawn = False
+
+
+class HostRateLimiter:
+    """按域名划分的令牌桶限速器，页面请求和链接检查共用
+    
+    - 每个域名独立的令牌桶，速率为每秒请求数
+    - 收到 429/503 时遵循 Retry-After，在此之前该域名的请求全部等待
+    - 出错或响应变慢时成倍降速，连续成功且响应较快时逐步提速
+    """
+    
+    THROTTLE_STATUSES = (429, 503)
+    MAX_RETRY_AFTER = 300  # Retry-After 最长等待秒数
+    
+    class _Bucket:
+        __slots__ = ('rate', 'tokens', 'updated', 'blocked_until', 'latency', 'success_streak')
+        
+        def __init__(self, rate, burst):
+            self.rate = rate
+            self.tokens = burst
+            self.updated = time.monotonic()
+            self.blocked_until = 0.0
+            self.latency = None
+            self.success_streak = 0
+    
+    def __init__(self, rate=5.0, burst=None, min_rate=0.2, max_rate=None,
+                 adaptive=True, target_latency=1.0, increase_every=10):
+        self.initial_rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.increase_every = increase_every
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.throttled_responses = 0
+    
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = self._Bucket(self.initial_rate, self.burst)
+        return bucket
+    
+    def acquire(self, host):
+        """阻塞直到该域名有可用令牌"""
+        while True:
+            with self._lock:
+                bucket = self._bucket(host)
+                now = time.monotonic()
+                if now < bucket.blocked_until:
+                    wait = bucket.blocked_until - now
+                else:
+                    bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+                    bucket.updated = now
+                    if bucket.tokens >= 1:
+                        bucket.tokens -= 1
+                        return
+                    wait = (1 - bucket.tokens) / bucket.rate
+            time.sleep(wait)
+    
+    def record(self, host, latency, status, retry_after=None):
+        """根据响应结果调整该域名的速率"""
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            
+            if status in self.THROTTLE_STATUSES:
+                self.throttled_responses += 1
+                wait = self._parse_retry_after(retry_after)
+                bucket.blocked_until = max(bucket.blocked_until, now + (wait if wait is not None else 1 / bucket.rate))
+                bucket.tokens = 0
+                self._decrease(bucket, 0.5)
+                return
+            
+            if status == 'ERROR' or (isinstance(status, int) and status >= 500):
+                self._decrease(bucket, 0.5)
+                return
+            
+            if not self.adaptive:
+                return
+            
+            bucket.latency = latency if bucket.latency is None else 0.8 * bucket.latency + 0.2 * latency
+            if bucket.latency > self.target_latency * 2:
+                self._decrease(bucket, 0.9)
+                return
+            
+            bucket.success_streak += 1
+            if bucket.success_streak >= self.increase_every and bucket.latency < self.target_latency:
+                bucket.rate = min(self.max_rate, bucket.rate + max(0.1, self.initial_rate * 0.1))
+                bucket.success_streak = 0
+    
+    def _decrease(self, bucket, factor):
+        bucket.success_streak = 0
+        if self.adaptive:
+            bucket.rate = max(self.min_rate, bucket.rate * factor)
+    
+    def _parse_retry_after(self, value):
+        """解析 Retry-After（秒数或HTTP日期），无法解析时返回None"""
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if retry_at.tzinfo is None:
+                retry_at = retry_at.replace(tzinfo=timezone.utc)
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        return min(max(0.0, seconds), self.MAX_RETRY_AFTER)
+    
+    def current_rates(self):
+        """返回各域名当前速率"""
+        with self._lock:
+            return {host: bucket.rate for host, bucket in self._buckets.items()}
+
+
+class LxmlElementAdapter:
+    """把lxml元素包装成位置/选择器生成代码所需的BeautifulSoup风格接口
+    
+    支持 name / get / [] / parent / children / get_text，class 属性与BeautifulSoup一样返回列表。
+    """
+    
+    __slots__ = ('_element',)
+    
+    def __init__(self, element):
+        self._element = element
+    
+    @property
+    def name(self):
+        tag = self._element.tag
+        # 注释、处理指令等节点的tag不是字符串
+        return tag if isinstance(tag, str) else None
+    
+    def get(self, key, default=None):
+        value = self._element.get(key)
+        if value is None:
+            return default
+        if key == 'class':
+            return value.split() or default
+        return value
+    
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+    
+    @property
+    def parent(self):
+        parent = self._element.getparent()
+        return LxmlElementAdapter(parent) if parent is not None else None
+    
+    @property
+    def children(self):
+        return [LxmlElementAdapter(child) for child in self._element]
+    
+    def get_text(self, strip=False):
+        if strip:
+            return ''.join(text.strip() for text in self._element.itertext())
+        return ''.join(self._element.itertext())
+    
+    def __eq__(self, other):
+        return isinstance(other, LxmlElementAdapter) and other._element is self._element
+    
+    def __hash__(self):
+        return hash(self._element)
+
+
+@lru_cache(maxsize=4096)
+def format_timestamp(seconds):
+    """把整数秒时间戳格式化为报告中使用的时间字符串"""
+    return datetime.fromtimestamp(seconds).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class ValueInterner:
+    """对链接记录中大量重复的字符串和class层级信息做驻留，多条记录共享同一对象"""
+    
+    def __init__(self):
+        self._classes = {}
+    
+    @staticmethod
+    def text(value):
+        return sys.intern(value) if isinstance(value, str) else value
+    
+    def classes(self, classes_info):
+        """把class层级信息转为共享的不可变元组"""
+        if not classes_info:
+            return ()
+        key = tuple((info['level'], info['tag'], info['classes']) for info in classes_info)
+        return self._classes.setdefault(key, key)
+
+
+class _CompactRecord:
+    """__slots__ 记录的公共部分：提供与原来字典相同的读取方式，并可转换回字典"""
+    
+    __slots__ = ()
+    FIELDS = ()
+    
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+    
+    def __contains__(self, key):
+        return key in self.FIELDS
+    
+    def keys(self):
+        return self.FIELDS
+    
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+    
+    @property
+    def classes_info(self):
+        return [{'tag': tag, 'classes': classes, 'level': level} for level, tag, classes in self._classes]
+
+
+class LinkStatusRecord(_CompactRecord):
+    """单条链接检查结果；检查时间以整数秒保存，读取 check_time 时才格式化"""
+    
+    __slots__ = ('parent_page', 'link_url', 'status_code', 'checked_at', 'matches_filter',
+                 'position', 'link_text', 'element_type', '_classes', 'element_id',
+                 'element_tag', 'css_selector', 'xpath', 'visual_position')
+    FIELDS = ('parent_page', 'link_url', 'status_code', 'check_time', 'matches_filter',
+              'position', 'link_text', 'element_type', 'classes_info', 'element_id',
+              'element_tag', 'css_selector', 'xpath', 'visual_position')
+    
+    def __init__(self, parent_page, link_url, status_code, checked_at, matches_filter,
+                 position, link_text, element_type, classes, element_id,
+                 element_tag, css_selector, xpath, visual_position):
+        self.parent_page = parent_page
+        self.link_url = link_url
+        self.status_code = status_code
+        self.checked_at = checked_at
+        self.matches_filter = matches_filter
+        self.position = position
+        self.link_text = link_text
+        self.element_type = element_type
+        self._classes = classes
+        self.element_id = element_id
+        self.element_tag = element_tag
+        self.css_selector = css_selector
+        self.xpath = xpath
+        self.visual_position = visual_position
+    
+    @property
+    def check_time(self):
+        return format_timestamp(self.checked_at)
+
+
+class Link404Record(_CompactRecord):
+    """单条404记录；发现时间以整数秒保存，读取 found_time 时才格式化"""
+    
+    __slots__ = ('url', 'found_at', 'status_code', 'parent_page', 'matches_filter',
+                 'position', 'link_text', 'element_type', '_classes', 'element_id',
+                 'element_tag', 'css_selector', 'xpath', 'visual_position', 'fix_suggestion')
+    FIELDS = ('url', 'found_time', 'status_code', 'parent_page', 'matches_filter',
+              'position', 'link_text', 'element_type', 'classes_info', 'element_id',
+              'element_tag', 'css_selector', 'xpath', 'visual_position', 'fix_suggestion')
+    
+    def __init__(self, url, found_at, status_code, parent_page, matches_filter,
+                 position, link_text, element_type, classes, element_id,
+                 element_tag, css_selector, xpath, visual_position, fix_suggestion):
+        self.url = url
+        self.found_at = found_at
+        self.status_code = status_code
+        self.parent_page = parent_page
+        self.matches_filter = matches_filter
+        self.position = position
+        self.link_text = link_text
+        self.element_type = element_type
+        self._classes = classes
+        self.element_id = element_id
+        self.element_tag = element_tag
+        self.css_selector = css_selector
+        self.xpath = xpath
+        self.visual_position = visual_position
+        self.fix_suggestion = fix_suggestion
+    
+    @property
+    def found_time(self):
+        return format_timestamp(self.found_at)
+
+
+def record_to_json(obj):
+    """json.dump 的 default 回调：把紧凑记录转换为字典"""
+    if isinstance(obj, _CompactRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# 位置关键词（按优先级排列，每个节点只匹配第一个）
+POSITION_INDICATORS = {
+    'header': ['header', 'top', 'navbar', 'nav-bar', 'navigation'],
+    'footer': ['footer', 'bottom', 'foot'],
+    'sidebar': ['sidebar', 'side-bar', 'aside'],
+    'main': ['main', 'content', 'body'],
+    'menu': ['menu', 'nav', 'navigation'],
+    'breadcrumb': ['breadcrumb', 'breadcrumbs'],
+    'pagination': ['pagination', 'pager'],
+    'search': ['search', 'search-box'],
+    'social': ['social', 'share', 'follow'],
+    'product': ['product', 'item', 'card'],
+    'category': ['category', 'cat', 'section'],
+    'banner': ['banner', 'hero', 'slider'],
+    'form': ['form', 'contact', 'subscribe']
+}
+
+POSITION_TAGS = ('header', 'footer', 'nav', 'aside', 'main', 'section', 'article')
+
+ANCESTOR_DEPTH = 5  # 位置/XPath/标识符最多向上查找的层数
+
+
+class _AncestorInfo:
+    """单个祖先节点上与链接定位相关的信息，同一页面内被所有子孙链接共享"""
+    
+    __slots__ = ('node', 'name', 'classes', 'class_str', 'element_id', 'positions',
+                 'selector_class', 'identifier_classes', 'xpath_step', 'parent')
+    
+    def __init__(self, node, xpath_step):
+        self.node = node
+        self.name = node.name
+        self.classes = node.get('class', []) or []
+        self.class_str = ' '.join(self.classes)
+        self.element_id = node.get('id', '') or ''
+        self.xpath_step = xpath_step
+        self.parent = node.parent
+        
+        # 位置标记：语义标签 + 第一个匹配的class/id关键词
+        positions = []
+        if self.name in POSITION_TAGS:
+            positions.append(f"<{self.name}>")
+        all_attrs = ' '.join(self.classes + [self.element_id]).lower()
+        for position, keywords in POSITION_INDICATORS.items():
+            if any(keyword in all_attrs for keyword in keywords):
+                positions.append(f"{position}({keywords[0]})")
+                break
+        self.positions = positions
+        
+        # 有意义的class：用于CSS选择器和最近标识符
+        meaningful = [c for c in self.classes if len(c) > 2 and not c.startswith('_')]
+        self.selector_class = meaningful[0] if meaningful else None
+        self.identifier_classes = [c for c in meaningful if not c.isdigit()][:2]
+
+
+class UrlClassifier:
+    """预编译的URL分类器，爬虫对每个链接都会多次调用，因此所有判断只在创建时准备一次
+    
+    - 目标域名只解析一次
+    - 静态资源扩展名：取路径最后一个 '.' 之后的部分在集合中查找
+    - 静态资源目录和路径筛选前缀各合并为一个预编译正则
+    - 每个URL的判断结果保存在LRU缓存中，页眉/页脚等重复链接直接命中
+    """
+    
+    STATIC_PATTERNS = (
+        '/_next/static/', '/static/', '/assets/', '/public/',
+        '/dist/', '/build/', '/css/', '/js/', '/images/',
+        '/img/', '/fonts/', '/media/'
+    )
+    INVALID_SCHEMES = frozenset(('mailto', 'tel', 'javascript'))
+    
+    def __init__(self, base_url, static_extensions, path_filter=None, cache_size=65536):
+        self.base_netloc = urlparse(base_url).netloc
+        self.static_extensions = frozenset(static_extensions)
+        self._static_pattern = re.compile('|'.join(re.escape(p) for p in self.STATIC_PATTERNS))
+        
+        self.path_filter = path_filter
+        self._filter_pattern = None
+        if path_filter:
+            if isinstance(path_filter, list):
+                prefixes = path_filter
+            else:
+                # 🔧 针对 /au 的精确匹配：确保路径以 / 开头
+                prefixes = [path_filter if path_filter.startswith('/') else '/' + path_filter]
+            self._filter_pattern = re.compile('|'.join(re.escape(p) for p in prefixes))
+        
+        self.is_static_resource = lru_cache(maxsize=cache_size)(self._is_static_resource)
+        self.is_valid_url = lru_cache(maxsize=cache_size)(self._is_valid_url)
+        self.matches_path_filter = lru_cache(maxsize=cache_size)(self._matches_path_filter)
+    
+    def _is_static_path(self, path):
+        """判断（已转小写的）路径是否为静态资源"""
+        dot = path.rfind('.')
+        if dot != -1 and path[dot:] in self.static_extensions:
+            return True
+        return self._static_pattern.search(path) is not None
+    
+    def _is_static_resource(self, url):
+        try:
+            return self._is_static_path(urlparse(url).path.lower())
+        except Exception:
+            return False
+    
+    def _is_valid_url(self, url):
+        try:
+            parsed = urlparse(url)
+        except Exception:
+            return False
+        
+        # 检查域名
+        if parsed.netloc and parsed.netloc != self.base_netloc:
+            return False
+        
+        # 检查协议
+        if parsed.scheme in self.INVALID_SCHEMES:
+            return False
+        
+        # 检查锚点
+        if url.startswith('#'):
+            return False
+        
+        # 检查静态资源
+        return not self._is_static_path(parsed.path.lower())
+    
+    def _matches_path_filter(self, url):
+        if self._filter_pattern is None:
+            return True
+        try:
+            return self._filter_pattern.match(urlparse(url).path) is not None
+        except Exception as e:
+            logger.error(f"路径匹配检查出错: {e}")
+            return False
+
+
+class UrlCanonicalizer:
+    """URL规范化：把指向同一页面的不同写法归并为同一个URL，在去重之前使用
+    
+    - 主机名转小写，去掉 #片段
+    - 查询参数：keep_params（白名单）不为空时只保留其中的参数，否则去掉 strip_params（支持通配符）中的参数
+    - trailing_slash: 'strip' 去掉末尾斜杠, 'add' 补全末尾斜杠（带扩展名的路径除外）, 'keep' 不处理
+    - shopify: /collections/<集合>/products/<商品> 归并为 /products/<商品>（保留 /en-au 等语言/地区前缀）
+    - honor_rel_canonical: 页面声明的 <link rel="canonical"> 与当前URL不同时，把规范地址加入爬取队列
+    
+    规范化只用于爬取队列和已访问集合的去重，链接检查和报告仍使用页面中的原始地址。
+    """
+    
+    DEFAULT_STRIP_PARAMS = (
+        'utm_*', '_pos', '_sid', '_ss', '_psq', '_fid', 'variant', 'fbclid', 'gclid', 'srsltid'
+    )
+    TRAILING_SLASH_POLICIES = ('keep', 'strip', 'add')
+    SHOPIFY_COLLECTION_PRODUCT = re.compile(
+        r'^((?:/[a-z]{2}(?:-[a-z]{2})?)?)/collections/[^/]+/products/([^/]+)/?$', re.IGNORECASE
+    )
+    
+    def __init__(self, strip_params=DEFAULT_STRIP_PARAMS, keep_params=None, trailing_slash='strip',
+                 lowercase_path=False, shopify=True, honor_rel_canonical=True, cache_size=65536):
+        if trailing_slash not in self.TRAILING_SLASH_POLICIES:
+            raise ValueError(f"不支持的末尾斜杠策略: {trailing_slash}")
+        self.keep_params = frozenset(keep_params) if keep_params is not None else None
+        self._strip_pattern = (
+            re.compile('|'.join(fnmatch.translate(p) for p in strip_params)) if strip_params else None
+        )
+        self.trailing_slash = trailing_slash
+        self.lowercase_path = lowercase_path
+        self.shopify = shopify
+        self.honor_rel_canonical = honor_rel_canonical
+        self.canonicalize = lru_cache(maxsize=cache_size)(self._canonicalize)
+    
+    @classmethod
+    def from_config(cls, config):
+        """根据配置创建：True 使用默认规则，字典覆盖部分规则，None/False 不启用"""
+        if not config:
+            return None
+        if config is True:
+            return cls()
+        return cls(**config)
+    
+    def _keep_param(self, name):
+        if self.keep_params is not None:
+            return name in self.keep_params
+        return self._strip_pattern is None or not self._strip_pattern.match(name)
+    
+    def _canonicalize(self, url):
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return url
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            return url
+        
+        path = parts.path or '/'
+        if self.lowercase_path:
+            path = path.lower()
+        if self.shopify:
+            match = self.SHOPIFY_COLLECTION_PRODUCT.match(path)
+            if match:
+                path = f"{match.group(1)}/products/{match.group(2)}"
+        if path != '/':
+            if self.trailing_slash == 'strip':
+                path = path.rstrip('/') or '/'
+            elif self.trailing_slash == 'add' and not path.endswith('/') and '.' not in path.rsplit('/', 1)[-1]:
+                path += '/'
+        
+        query = parts.query
+        if query:
+            params = parse_qsl(query, keep_blank_values=True)
+            kept = [(name, value) for name, value in params if self._keep_param(name)]
+            # 没有参数被去掉时保留原始查询串，避免改变编码方式
+            if len(kept) != len(params):
+                query = urlencode(kept)
+        
+        return urlunsplit((scheme, parts.netloc.lower(), path, query, ''))
+
+
+def create_http_session(pool_size=20, rate_limited=False):
+    """创建带连接池和重试的HTTP会话"""
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    })
+    # 启用限速时由限速器统一处理 Retry-After，避免urllib3在单个线程内静默等待
+    max_retries = Retry(total=3, respect_retry_after_header=False) if rate_limited else 3
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=pool_size,
+        max_retries=max_retries
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 class Link404Crawler:
+    # HEAD返回这些状态码时不可信（服务器不支持或拒绝HEAD），改用GET确认
+    HEAD_FALLBACK_STATUSES = (403, 405, 501)
+    # 链接检查时逐跳跟随的重定向状态码和最大跳数
+    REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+    MAX_REDIRECTS = 20  # 与浏览器的上限一致
+    
     def __init__(self, domain, max_pages=100, delay=1, path_filter=None, 
-                 max_workers=5, timeout=10):
+                 max_workers=5, timeout=10, engine='sync', max_inflight_pages=None,
+                 use_status_cache=True, status_store_path=None, status_ttl=86400,
+                 checkpoint_path=None, checkpoint_interval=50, resume=False,
+                 frontier_priority=None, use_bloom_filter=False,
+                 rate_limit=None, adaptive_rate=True, max_throttle_retries=2,
+                 html_parser=None, lazy_link_metadata=False, stream_reports=False,
+                 revalidate_pages=True, parse_workers=0, use_sitemaps=False, sitemap_urls=None,
+                 report_dir=None, status_cache=None, session=None, link_executor=None, rate_limiter=None,
+                 canonicalization=None, metrics_path=None, metrics_interval=10, metrics_port=None,
+                 log_mode='verbose', log_every=50, diff_baseline=None, long_redirect_chain=2):
         self.domain = domain
         self.base_url = self._normalize_url(domain)
         self.max_pages = max_pages
@@ -29,15 +1333,139 @@ class Link404Crawler:
         self.timeout = timeout
         self.max_workers = max_workers
         
-        # 数据存储
+        # 爬取引擎: 'sync' 逐页爬取, 'async' 同时保持多个页面在处理中
+        if engine not in ('sync', 'async'):
+            raise ValueError(f"不支持的爬取引擎: {engine}")
+        self.engine = engine
+        self.max_inflight_pages = max_inflight_pages or max_workers
+        
+        # HTML解析器: 'lxml'（快速路径，默认）或 'html.parser'（BeautifulSoup）
+        if html_parser is None:
+            html_parser = 'lxml' if LXML_AVAILABLE else 'html.parser'
+        if html_parser not in ('lxml', 'html.parser'):
+            raise ValueError(f"不支持的HTML解析器: {html_parser}")
+        if html_parser == 'lxml' and not LXML_AVAILABLE:
+            logger.warning("⚠️ 未安装lxml，改用BeautifulSoup的html.parser")
+            html_parser = 'html.parser'
+        self.html_parser = html_parser
+        
+        # 延迟计算位置信息：只为非2xx链接生成位置/CSS选择器/XPath
+        self.lazy_link_metadata = lazy_link_metadata
+        
+        # 多进程解析：parse_workers > 0 时HTML解析和位置信息计算交给子进程，
+        # 页面线程继续下载其他页面（子进程总是计算完整位置信息）
+        # 同步引擎逐页处理，解析期间没有其他页面可下载，子进程只会增加传输开销
+        if parse_workers > 0 and engine == 'sync':
+            logger.warning("⚠️ 同步引擎不支持多进程解析，已忽略 parse_workers（请配合 engine='async' 使用）")
+            parse_workers = 0
+        self.parse_workers = parse_workers
+        self._parse_pool = None
+        
+        # 数据存储（链接记录中的重复字符串统一驻留）
+        self._interner = ValueInterner()
         self.visited_urls = set()
         self.found_404s = []
         self.all_links = set()
         self.page_link_details = []
         self._lock = threading.Lock()
         
-        # HTTP会话配置
-        self.session = self._create_session()
+        # 流式报告：页面详情逐页写入JSON Lines文件，报告生成时再逐条读取
+        self.stream_reports = stream_reports
+        self.page_details_path = None
+        self._page_details_file = None
+        
+        # 报告输出目录（默认当前目录）
+        self.report_dir = report_dir
+        
+        # 异步引擎运行期间共享的链接检查线程池；批量检测时由外部传入，多个站点共用
+        self._link_executor = None
+        self._shared_link_executor = link_executor
+        
+        # 整个爬取过程共享的链接状态缓存，页眉/页脚等重复链接只检查一次
+        # 批量检测时传入同一个缓存，跨站点的相同链接也只检查一次
+        if status_cache is not None:
+            self.status_cache = status_cache
+        else:
+            self.status_cache = LinkStatusCache() if use_status_cache else None
+        
+        # 爬取队列与断点续爬
+        # frontier_priority: None 按发现顺序(广度优先), 'depth' 路径层级浅的页面优先
+        if frontier_priority not in (None, 'depth'):
+            raise ValueError(f"不支持的队列优先级策略: {frontier_priority}")
+        self.frontier_priority = frontier_priority
+        self.use_bloom_filter = use_bloom_filter
+        self.url_queue = self._create_frontier()
+        self.pages_crawled = 0
+        self._inflight_urls = set()
+        self._start_url = None
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = max(1, checkpoint_interval)
+        self.resume = resume
+        self._pages_since_checkpoint = 0
+        # 增量断点：结果只追加写入 <断点文件>.results.jsonl，断点文件本身只保存队列、已访问集合和结果文件偏移
+        self.checkpoint_results_path = f"{checkpoint_path}.results.jsonl" if checkpoint_path else None
+        self._ckpt_results_offset = None  # None 表示尚未写入，首次保存时新建结果文件
+        self._ckpt_404_pos = 0
+        self._ckpt_details_pos = 0
+        self._ckpt_deferred_404s = []  # 保存时仍在处理中的页面产生的记录，留到下次保存
+        self._ckpt_deferred_details = []
+        self._ckpt_new_links = []
+        self._ckpt_cache_pos = 0
+        
+        # 站点地图：从 robots.txt 声明的（或指定的）sitemap 加载URL，作为爬取队列的初始种子
+        self.sitemap_urls = list(sitemap_urls or [])
+        self.use_sitemaps = use_sitemaps or bool(self.sitemap_urls)
+        self.sitemap_pages_seeded = 0
+        
+        # 可选的持久化状态存储，跨多次运行复用未过期的检查结果
+        self.status_store = PersistentStatusStore(status_store_path, status_ttl) if status_store_path else None
+        
+        # 页面条件请求：依赖持久化存储保存页面校验信息和链接
+        self.revalidate_pages = revalidate_pages and self.status_store is not None
+        self.pages_not_modified = 0
+        
+        # 按域名限速：设置 rate_limit（每秒请求数）后替代固定的页面间延迟
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
+        else:
+            self.rate_limiter = HostRateLimiter(rate_limit, adaptive=adaptive_rate) if rate_limit else None
+        self.max_throttle_retries = max_throttle_retries
+        
+        # HEAD结果与GET不一致的域名，之后直接用GET检查
+        self._get_only_hosts = set()
+        self.head_fallbacks = 0
+        
+        # 重定向链：URL → 跳转路径；每一跳的结果缓存在 _redirect_hops 中，共享的中间跳转只请求一次。
+        # 跳转次数达到 long_redirect_chain 的链在报告中标记为长链
+        self.long_redirect_chain = long_redirect_chain
+        self.redirect_chains = {}
+        self._redirect_hops = {}  # 跳转URL → (状态码, 下一跳URL或None)
+        self.redirect_hop_cache_hits = 0
+        self._redirect_updates = None  # 分布式工作者设为集合：记录新增或更新了来源页面的链，逐页上报
+        
+        # 日志模式：verbose 逐页/逐个404输出详细信息；quiet 把这些信息降到DEBUG级别，
+        # 只输出进度条（或每 log_every 页一行进度）和最终统计
+        if log_mode not in LOG_MODES:
+            raise ValueError(f"未知的日志模式: {log_mode}（可选: {', '.join(LOG_MODES)}）")
+        self.log_mode = log_mode
+        self.log_every = log_every
+        self._detail_level = logging.INFO if log_mode == 'verbose' else logging.DEBUG
+        self._progress = None
+        
+        # 增量检测：读取上一次运行的结果，只检查上次失效的链接和新链接
+        self.diff_baseline = PreviousRunBaseline.load(diff_baseline) if diff_baseline else None
+        self._diff_observed = {}  # 上次失效的URL键 → 本次观察到的状态
+        
+        # 运行指标：阶段耗时、请求数、字节数、队列深度；可定期写入JSON或通过本机端口查看
+        self.metrics = CrawlMetrics()
+        self.metrics.set_gauge('link_pool_size', getattr(link_executor, '_max_workers', max_workers))
+        self._metrics_exporter = None
+        if metrics_path or metrics_port is not None:
+            self._metrics_exporter = MetricsExporter(self.metrics, metrics_path, metrics_interval, metrics_port)
+        
+        # HTTP会话配置（外部传入的会话由调用方负责关闭）
+        self._owns_session = session is None
+        self.session = session if session is not None else self._create_session()
         
         # 静态资源文件扩展名列表
         self.static_extensions = {
@@ -50,6 +1478,15 @@ class Link404Crawler:
             '.zip', '.rar', '.7z', '.tar', '.gz', '.bz2',
             '.xml', '.json', '.csv', '.swf', '.map'
         }
+        
+        # 预编译的URL分类器（静态资源/有效链接/路径筛选），每个URL的结果有LRU缓存
+        self.url_classifier = UrlClassifier(self.base_url, self.static_extensions, path_filter)
+        
+        # 可选的URL规范化（去掉跟踪参数、统一末尾斜杠、Shopify集合商品路径、rel=canonical）
+        self.canonicalization = canonicalization
+        self.canonicalizer = UrlCanonicalizer.from_config(canonicalization)
+        self.canonical_duplicates = 0
+        self._canonical_targets = []  # 页面声明、等待加入爬取队列的规范地址
     
     def _normalize_url(self, domain):
         """标准化URL格式"""
@@ -59,232 +1496,524 @@ class Link404Crawler:
     
     def _create_session(self):
         """创建HTTP会话"""
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        # 设置连接池大小
-        adapter = requests.adapters.HTTPAdapter(
-            pool_connections=20,
-            pool_maxsize=20,
-            max_retries=3
-        )
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-        return session
+        # 设置连接池大小（异步引擎下页面请求和链接检查共用同一个连接池）
+        pool_size = max(20, self.max_inflight_pages + self.max_workers)
+        return create_http_session(pool_size, rate_limited=self.rate_limiter is not None)
     
     def is_static_resource(self, url):
         """检查URL是否为静态资源文件"""
-        try:
-            parsed = urlparse(url)
-            path = parsed.path.lower()
-            
-            # 检查文件扩展名
-            if any(path.endswith(ext) for ext in self.static_extensions):
-                return True
-            
-            # 检查路径模式
-            static_patterns = [
-                '/_next/static/', '/static/', '/assets/', '/public/',
-                '/dist/', '/build/', '/css/', '/js/', '/images/',
-                '/img/', '/fonts/', '/media/'
-            ]
-            
-            return any(pattern in path for pattern in static_patterns)
-            
-        except Exception:
-            return False
+        return self.url_classifier.is_static_resource(url)
     
     def is_valid_url(self, url):
         """检查URL是否有效且属于目标域名"""
-        try:
-            parsed = urlparse(url)
-            base_parsed = urlparse(self.base_url)
-            
-            # 检查域名
-            if parsed.netloc and parsed.netloc != base_parsed.netloc:
-                return False
-            
-            # 检查协议
-            if parsed.scheme in ['mailto', 'tel', 'javascript']:
-                return False
-            
-            # 检查锚点
-            if url.startswith('#'):
-                return False
-            
-            # 检查静态资源
-            if self.is_static_resource(url):
-                return False
-            
-            return True
-            
-        except Exception:
-            return False
+        return self.url_classifier.is_valid_url(url)
     
     def matches_path_filter(self, url):
         """检查URL是否匹配路径过滤器"""
-        if not self.path_filter:
-            return True
-        
-        try:
-            parsed = urlparse(url)
-            path = parsed.path
-            
-            if isinstance(self.path_filter, list):
-                return any(path.startswith(filter_path) for filter_path in self.path_filter)
-            else:
-                # 🔧 针对 /au 的精确匹配
-                filter_path = self.path_filter
-                # 确保路径以 / 开头
-                if not filter_path.startswith('/'):
-                    filter_path = '/' + filter_path
-                
-                # 检查路径是否以筛选条件开头
-                return path.startswith(filter_path)
-                
-        except Exception as e:
-            logger.error(f"路径匹配检查出错: {e}")
-            return False
+        return self.url_classifier.matches_path_filter(url)
     
-    def detect_link_position_and_classes(self, element):
-        """检测链接在页面中的位置和class属性"""
+    def detect_link_position_and_classes(self, element, memo=None):
+        """检测链接在页面中的位置和class属性
+        
+        只向上遍历一次祖先节点，同时生成位置、CSS选择器、XPath和最近标识符。
+        memo 为同一页面内共享的祖先信息缓存，同一容器下的兄弟链接不会重复计算。
+        """
+        if memo is None:
+            memo = {}
+        chain = self._ancestor_chain(element, memo)
+        current = chain[0]
+        
         positions = []
         classes_info = []
-        current = element
         
-        position_indicators = {
-            'header': ['header', 'top', 'navbar', 'nav-bar', 'navigation'],
-            'footer': ['footer', 'bottom', 'foot'],
-            'sidebar': ['sidebar', 'side-bar', 'aside'],
-            'main': ['main', 'content', 'body'],
-            'menu': ['menu', 'nav', 'navigation'],
-            'breadcrumb': ['breadcrumb', 'breadcrumbs'],
-            'pagination': ['pagination', 'pager'],
-            'search': ['search', 'search-box'],
-            'social': ['social', 'share', 'follow'],
-            'product': ['product', 'item', 'card'],
-            'category': ['category', 'cat', 'section'],
-            'banner': ['banner', 'hero', 'slider'],
-            'form': ['form', 'contact', 'subscribe']
+        # 收集当前元素的class信息
+        if current.classes:
+            classes_info.append({
+                'tag': current.name,
+                'classes': current.class_str,
+                'level': 'current'
+            })
+        
+        for level, info in enumerate(chain):
+            positions.extend(info.positions)
+            # 收集父级元素的class信息（不重复收集当前元素）
+            if info.classes and level > 0:
+                classes_info.append({
+                    'tag': info.name,
+                    'classes': info.class_str,
+                    'level': f'parent-{level}'
+                })
+        
+        position_str = " > ".join(reversed(positions)) if positions else "页面主体"
+        
+        return {
+            'position': position_str,
+            'classes_info': classes_info,
+            'element_id': current.element_id,
+            'element_tag': current.name,
+            'css_selector': self._css_selector_from_chain(chain),
+            'xpath': self._xpath_from_chain(chain),
+            'visual_position': self._determine_visual_position(positions, current.classes),
+            'identifiers': self._identifiers_from_chain(chain)
         }
+    
+    def _ancestor_chain(self, element, memo):
+        """返回从元素开始向上最多 ANCESTOR_DEPTH 层的祖先信息列表"""
+        chain = []
+        current = element
+        while current is not None and current.name and len(chain) < ANCESTOR_DEPTH:
+            info = self._ancestor_info(current, memo)
+            chain.append(info)
+            current = info.parent
+        return chain
+    
+    def _ancestor_info(self, node, memo):
+        """获取节点信息，同一页面内按节点缓存"""
+        raw = self._raw_node(node)
+        info = memo.get(id(raw))
+        if info is None:
+            info = _AncestorInfo(node, self._xpath_step(node, memo))
+            # 缓存中保留原始节点引用，保证 id() 在页面处理期间不会被复用
+            memo[id(raw)] = info
+        return info
+    
+    @staticmethod
+    def _raw_node(node):
+        """返回底层节点对象（lxml包装器每次访问parent都会新建）"""
+        return node._element if isinstance(node, LxmlElementAdapter) else node
+    
+    def _xpath_step(self, node, memo):
+        """生成节点在XPath中的一级，如 li[3]；同级位置按父节点一次性计算"""
+        parent = node.parent
+        if parent is None:
+            return node.name
+        
+        raw_parent = self._raw_node(parent)
+        key = ('siblings', id(raw_parent))
+        sibling_index = memo.get(key)
+        if sibling_index is None:
+            counts = {}
+            positions = {}
+            children = []
+            for child in parent.children:
+                tag = getattr(child, 'name', None)
+                if not tag:
+                    continue
+                raw_child = self._raw_node(child)
+                children.append(raw_child)
+                counts[tag] = counts.get(tag, 0) + 1
+                positions[id(raw_child)] = counts[tag]
+            # 同时保留父节点和子节点引用，保证 id() 稳定（lxml节点对象没有引用时会被回收）
+            sibling_index = (counts, positions, (raw_parent, children))
+            memo[key] = sibling_index
+        
+        counts, positions, _ = sibling_index
+        if counts.get(node.name, 0) > 1:
+            return f"{node.name}[{positions[id(self._raw_node(node))]}]"
+        return node.name
+    
+    def _css_selector_from_chain(self, chain):
+        """根据祖先信息生成CSS选择器，优先使用最近的ID或有意义的class"""
+        current = chain[0]
+        
+        if current.element_id:
+            return f"#{current.element_id}"
+        if current.selector_class:
+            return f".{current.selector_class}"
+        
+        # 向上查找父级元素的ID或有意义的class（最多3层）
+        selectors = []
+        for info in chain[:3]:
+            parent_selector = None
+            if info.element_id:
+                parent_selector = f"#{info.element_id}"
+            elif info.selector_class:
+                parent_selector = f".{info.selector_class}"
+            if parent_selector:
+                if selectors:
+                    return f"{parent_selector} {' '.join(reversed(selectors))}"
+                return f"{parent_selector} {current.name}"
+            
+            # 添加当前标签到选择器路径（只添加第一个class）
+            selectors.append(f"{info.name}.{info.classes[0]}" if info.classes else info.name)
+        
+        # 如果没有找到ID或有意义的class，返回标签路径
+        return ' > '.join(reversed(selectors[-3:])) if selectors else current.name
+    
+    def _xpath_from_chain(self, chain):
+        """根据祖先信息生成XPath路径"""
+        xpath_parts = []
+        for info in chain:
+            # 如果有ID，使用ID定位
+            if info.element_id:
+                xpath_parts.append(f"//{info.name}[@id='{info.element_id}']")
+                break
+            xpath_parts.append(info.xpath_step)
+        
+        if xpath_parts:
+            return '/' + '/'.join(reversed(xpath_parts))
+        return ''
+    
+    def _identifiers_from_chain(self, chain):
+        """根据祖先信息列出最近的ID和class标识符"""
+        identifiers = []
+        for level, info in enumerate(chain):
+            if info.element_id:
+                identifiers.append({
+                    'type': 'id',
+                    'value': info.element_id,
+                    'selector': f"#{info.element_id}",
+                    'level': level,
+                    'tag': info.name
+                })
+            for cls in info.identifier_classes:
+                identifiers.append({
+                    'type': 'class',
+                    'value': cls,
+                    'selector': f".{cls}",
+                    'level': level,
+                    'tag': info.name
+                })
+        return identifiers
+    
+    def check_url_status(self, url, headers=None):
+        """检查URL的状态码（重定向时为跳转链最终的状态码）"""
+        _, status, _ = self._resolve_url_status(url, headers)
+        return status
+    
+    def _resolve_url_status(self, url, headers=None):
+        """逐跳跟随重定向检查URL，返回 (最后一次实际请求的响应或None, 最终状态, 跳转链)
+        
+        跳转链为 [(URL, 状态码), ...]，没有重定向时只有一项。每一跳的结果都记入跳转缓存，
+        多个链接经过同一个中间跳转时只请求一次。出现循环或超过 MAX_REDIRECTS 跳时最终状态为 'ERROR'。
+        """
+        chain = []
+        seen = set()
+        response = None
+        current = url
+        loop = False
+        while True:
+            if current in seen:
+                loop = True
+                chain.append((current, 'LOOP'))
+                status = 'ERROR'
+                break
+            seen.add(current)
+            
+            hop = self._redirect_hops.get(current)
+            if hop is not None:
+                with self._lock:
+                    self.redirect_hop_cache_hits += 1
+                status, next_url = hop
+            else:
+                # 条件请求头只属于原始URL
+                response = self._request_url_status(current, None if chain else headers)
+                if response is None:
+                    chain.append((current, 'ERROR'))
+                    status = 'ERROR'
+                    break
+                status = response.status_code
+                location = response.headers.get('Location')
+                next_url = None
+                if status in self.REDIRECT_STATUSES and location:
+                    next_url = urljoin(current, location).split('#', 1)[0]
+            
+            chain.append((current, status))
+            if next_url is None:
+                break
+            if len(chain) > self.MAX_REDIRECTS:
+                status = 'ERROR'
+                break
+            current = next_url
+        
+        if len(chain) > 1:
+            self._record_redirect_chain(url, chain, status, loop)
+        return response, status, chain
+    
+    def _record_redirect_chain(self, url, chain, final_status, loop=False):
+        """保存重定向链，并把每一跳的结果放入跳转缓存和状态缓存"""
+        with self._lock:
+            for i, (hop_url, hop_status) in enumerate(chain):
+                if hop_status in ('LOOP', 'ERROR'):
+                    continue
+                next_url = chain[i + 1][0] if i + 1 < len(chain) else None
+                self._redirect_hops.setdefault(hop_url, (hop_status, next_url))
+            self.redirect_chains[url] = {
+                'url': url,
+                'hops': [{'url': hop_url, 'status_code': hop_status} for hop_url, hop_status in chain],
+                'final_status': final_status,
+                'redirects': len(chain) - 1,
+                'loop': loop,
+                'long': len(chain) - 1 >= self.long_redirect_chain,
+                'parent_pages': []
+            }
+            if self._redirect_updates is not None:
+                self._redirect_updates.add(url)
+        # 中间跳转的最终状态与起点相同，之后直接链接到这些URL时不必再请求
+        if self.status_cache is not None and not loop:
+            for hop_url, _ in chain[1:]:
+                if hop_url not in self.status_cache:
+                    self.status_cache.put(hop_url, final_status)
+    
+    def _restore_redirect_chain(self, url, hops, final_status):
+        """复用上次的检查结果时，按保存的跳转链恢复重定向记录（不发送请求）"""
+        if hops and len(hops) > 1 and url not in self.redirect_chains:
+            self._record_redirect_chain(url, [tuple(hop) for hop in hops], final_status)
+    
+    def _chain_from_hops(self, url):
+        """用跳转缓存拼出从 url 开始的跳转链；url 不是跳转或链不完整时返回None"""
+        chain = []
+        seen = set()
+        current = url
+        while current is not None and current not in seen:
+            hop = self._redirect_hops.get(current)
+            if hop is None:
+                return None
+            seen.add(current)
+            chain.append((current, hop[0]))
+            current = hop[1]
+        if current is not None or len(chain) < 2:
+            return None
+        return chain
+    
+    def _note_redirect_parent(self, link_url, parent_url):
+        """记录链接到重定向URL的页面（最多保留5个示例）"""
+        chain = self.redirect_chains.get(link_url)
+        if chain is None and link_url in self._redirect_hops:
+            # 链接本身是其他跳转链的中间一跳，状态直接取自状态缓存，这里补上它自己的跳转链
+            hops = self._chain_from_hops(link_url)
+            if hops is not None:
+                self._record_redirect_chain(link_url, hops, hops[-1][1])
+                chain = self.redirect_chains.get(link_url)
+        if chain is not None and len(chain['parent_pages']) < 5 and parent_url not in chain['parent_pages']:
+            chain['parent_pages'].append(parent_url)
+            if self._redirect_updates is not None:
+                self._redirect_updates.add(link_url)
+    
+    def _request_url_status(self, url, headers=None):
+        """发送单次状态检查请求（不跟随重定向），返回响应对象；请求失败时返回None
+        
+        先发HEAD；HEAD出错或返回 405/501/403 时改用GET。GET以流式方式发送，
+        读取响应头后立即关闭，不下载正文。某个域名的HEAD返回 405/501/403 而GET
+        返回其他状态码时，记住该域名，之后对它直接使用GET；HEAD请求出错（超时、
+        连接中断等）可能只是偶发故障，不作为判断依据。
+        """
+        host = urlparse(url).netloc
+        head_status = None
+        if host not in self._get_only_hosts:
+            try:
+                response = self._send_request('HEAD', url, allow_redirects=False, headers=headers)
+            except requests.exceptions.RequestException:
+                head_status = 'ERROR'
+            else:
+                if response.status_code not in self.HEAD_FALLBACK_STATUSES:
+                    return response
+                head_status = response.status_code
+        
+        try:
+            response = self._send_request('GET', url, allow_redirects=False, headers=headers, stream=True)
+        except Exception as e:
+            logger.warning(f"检查URL状态失败 {url}: {e}")
+            return None
+        response.close()
         
-        # 收集当前元素的class信息
-        element_classes = element.get('class', [])
-        if element_classes:
-            classes_info.append({
-                'tag': element.name,
-                'classes': ' '.join(element_classes),
-                'level': 'current'
-            })
+        if head_status is not None:
+            with self._lock:
+                self.head_fallbacks += 1
+                learned = (head_status != 'ERROR' and head_status != response.status_code
+                           and host not in self._get_only_hosts)
+                if learned:
+                    self._get_only_hosts.add(host)
+            if learned:
+                logger.info(f"🔁 {host} 的HEAD结果不可信 (HEAD {head_status}, GET {response.status_code})，之后改用GET检查")
+        return response
+    
+    def _send_request(self, method, url, **kwargs):
+        """发送HTTP请求；启用限速时按域名获取令牌，并在 429/503 时按 Retry-After 重试"""
+        kwargs.setdefault('timeout', self.timeout)
+        if self.rate_limiter is None:
+            return self._timed_request(method, url, **kwargs)
         
-        level = 0
-        while current and current.name and level < 5:  # 最多向上查找5层
-            # 检查HTML标签
-            if current.name in ['header', 'footer', 'nav', 'aside', 'main', 'section', 'article']:
-                positions.append(f"<{current.name}>")
-            
-            # 检查class和id属性
-            classes = current.get('class', [])
-            element_id = current.get('id', '')
-            
-            # 收集父级元素的class信息
-            if classes and level > 0:  # 不重复收集当前元素
-                classes_info.append({
-                    'tag': current.name,
-                    'classes': ' '.join(classes),
-                    'level': f'parent-{level}'
-                })
-            
-            all_attrs = ' '.join(classes + [element_id]).lower()
-            
-            for position, keywords in position_indicators.items():
-                if any(keyword in all_attrs for keyword in keywords):
-                    positions.append(f"{position}({keywords[0]})")
-                    break
+        host = urlparse(url).netloc
+        for attempt in range(self.max_throttle_retries + 1):
+            self.rate_limiter.acquire(host)
+            started = time.monotonic()
+            try:
+                response = self._timed_request(method, url, **kwargs)
+            except requests.exceptions.RequestException:
+                self.rate_limiter.record(host, time.monotonic() - started, 'ERROR')
+                raise
             
-            current = current.parent
-            level += 1
+            self.rate_limiter.record(host, time.monotonic() - started, response.status_code,
+                                     response.headers.get('Retry-After'))
+            if response.status_code not in HostRateLimiter.THROTTLE_STATUSES or attempt == self.max_throttle_retries:
+                return response
+            logger.warning(f"⏳ {host} 返回 {response.status_code}，稍后重试: {url}")
+            response.close()
+        return response
+    
+    def _timed_request(self, method, url, **kwargs):
+        """发送请求并记录耗时和状态码"""
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.metrics.record_request(method, 'ERROR', time.perf_counter() - started)
+            raise
+        self.metrics.record_request(method, response.status_code, time.perf_counter() - started)
+        return response
+    
+    def _check_url_status_incremental(self, url):
+        """增量检测：上次正常的链接直接复用状态；上次失效的链接忽略有效期重新检查"""
+        baseline = self.diff_baseline
+        status = baseline.ok_status(url)
+        if status is not None:
+            with self._lock:
+                baseline.reused += 1
+            self._restore_redirect_chain(url, baseline.redirect_hops(url), status)
+            return status
         
-        position_str = " > ".join(reversed(positions)) if positions else "页面主体"
+        if baseline.was_broken(url):
+            _, status, chain = self._resolve_url_status(url)
+            if self.status_store is not None and isinstance(status, int):
+                self.status_store.put(url, status, redirect_hops=chain if len(chain) > 1 else None)
+            return status
+        
+        if self.status_store is not None:
+            return self._check_url_status_stored(url)
+        return self.check_url_status(url)
+    
+    def _observe_for_diff(self, url, status):
+        """记录上次失效的URL在本次运行中的状态，用于区分已修复和本次未遇到"""
+        if self.diff_baseline is not None and self.diff_baseline.was_broken(url):
+            with self._lock:
+                self._diff_observed[normalize_url_key(url)] = status
+    
+    def _check_url_status_stored(self, url):
+        """结合持久化存储检查URL状态：有效期内直接复用，过期则条件请求重新验证"""
+        store = self.status_store
+        entry = store.get(url)
         
-        # 生成CSS选择器
-        css_selector = self._generate_enhanced_css_selector(element)
+        if entry is not None and store.is_fresh(entry):
+            store.count('fresh_hits')
+            self._restore_redirect_chain(url, entry['redirect_hops'], entry['status'])
+            return entry['status']
         
-        # 保存当前元素用于后续处理
-        self._current_element = element
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
         
-        # 生成XPath
-        xpath = self._generate_xpath(element)
+        response, status, chain = self._resolve_url_status(url, headers or None)
+        if chain[-1][1] == 'ERROR':
+            # 请求失败，可能只是暂时的，不写入存储
+            return 'ERROR'
         
-        # 确定可视化位置
-        visual_position = self._determine_visual_position(positions, element_classes)
+        if status == 304 and len(chain) == 1 and response is not None and entry is not None:
+            store.count('revalidated')
+            store.touch(url)
+            return entry['status']
         
-        return {
-            'position': position_str,
-            'classes_info': classes_info,
-            'element_id': element.get('id', ''),
-            'element_tag': element.name,
-            'css_selector': css_selector,
-            'xpath': xpath,
-            'visual_position': visual_position
-        }
+        if response is not None:
+            store.count('fetched')
+        # 发生重定向时校验信息属于最终URL，不保存；结果来自跳转缓存时没有响应头
+        if len(chain) > 1 or response is None:
+            if isinstance(status, int):
+                store.put(url, status, redirect_hops=chain if len(chain) > 1 else None)
+        else:
+            store.put(
+                url, status,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+        return status
     
-    def check_url_status(self, url):
-        """检查URL的状态码"""
-        try:
-            # 先尝试HEAD请求
-            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
-            return response.status_code
-        except requests.exceptions.RequestException:
-            try:
-                # HEAD失败则尝试GET请求
-                response = self.session.get(url, timeout=self.timeout, allow_redirects=True)
-                return response.status_code
-            except Exception as e:
-                logger.warning(f"检查URL状态失败 {url}: {e}")
-                return 'ERROR'
     
+    def get_url_status(self, url):
+        """获取URL状态码，优先使用爬取期间的状态缓存和持久化存储"""
+        if self.diff_baseline is not None:
+            check_func = self._check_url_status_incremental
+        elif self.status_store is not None:
+            check_func = self._check_url_status_stored
+        else:
+            check_func = self.check_url_status
+        if self.status_cache is None:
+            return check_func(url)
+        return self.status_cache.get_or_check(url, check_func)
+    
+    @timed_phase('link_check')
     def check_urls_batch(self, urls):
         """批量检查URL状态"""
-        results = {}
+        # 已缓存的URL直接取结果，不再提交到线程池
+        if self.status_cache is not None:
+            results = {}
+            unchecked = []
+            for url in urls:
+                status = self.status_cache.peek(url)
+                if status is None:
+                    unchecked.append(url)
+                else:
+                    results[url] = status
+            if not unchecked:
+                return results
+            results.update(self._check_urls_uncached(unchecked))
+            return results
+        
+        return self._check_urls_uncached(urls)
+    
+    def _check_urls_uncached(self, urls):
+        """使用线程池检查一批URL"""
+        # 异步引擎运行时复用共享线程池，避免每个页面各自创建线程池
+        executor = self._link_executor or self._shared_link_executor
+        if executor is not None:
+            return self._collect_url_statuses(executor, urls)
         
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_url = {executor.submit(self.check_url_status, url): url for url in urls}
-            
-            for future in as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    status = future.result()
-                    results[url] = status
-                except Exception as e:
-                    logger.error(f"检查URL {url} 时出错: {e}")
-                    results[url] = 'ERROR'
+            return self._collect_url_statuses(executor, urls)
+    
+    def _tracked_url_status(self, url):
+        """在链接检查线程中获取状态，同时统计正在进行的检查数（线程池利用率）"""
+        self.metrics.add_gauge('link_checks_active', 1)
+        try:
+            return self.get_url_status(url)
+        finally:
+            self.metrics.add_gauge('link_checks_active', -1)
+    
+    def _collect_url_statuses(self, executor, urls):
+        """提交URL检查任务并收集结果"""
+        results = {}
+        future_to_url = {executor.submit(self._tracked_url_status, url): url for url in urls}
+        
+        for future in as_completed(future_to_url):
+            url = future_to_url[future]
+            try:
+                status = future.result()
+                results[url] = status
+            except Exception as e:
+                logger.error(f"检查URL {url} 时出错: {e}")
+                results[url] = 'ERROR'
         
         return results
     
-    def extract_and_check_links_from_page(self, url):
-        """从页面提取并检查链接"""
+    def extract_and_check_links_from_page(self, url, fetched=None):
+        """从页面提取并检查链接；fetched 为 _fetch_page 已取得的响应时不再重复请求"""
+        detail = self._detail_level
         try:
-            logger.info(f"🔍 开始检测页面: {url}")
-            response = self.session.get(url, timeout=self.timeout)
-            
-            if response.status_code != 200:
-                logger.warning(f"⚠️ 页面访问失败: {url} (状态码: {response.status_code})")
+            logger.log(detail, "🔍 开始检测页面: %s", url)
+            page = self._load_page_links(url, fetched=fetched)
+            if page is None:
                 return set()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            links = set()
-            link_positions = {}
+            links, link_positions, title, page_validators = page
             
             # 添加调试信息：显示页面基本信息
-            logger.info(f"📄 页面标题: {soup.title.string if soup.title else '无标题'}")
-            
-            # 提取所有链接
-            self._extract_links_from_soup(soup, url, links, link_positions)
+            if page_validators == 'cached':
+                logger.log(detail, "♻️ 页面未修改(304)，复用上次提取的链接")
+            logger.log(detail, "📄 页面标题: %s", title or '无标题')
             
             # 添加调试信息：显示提取到的链接数量
-            logger.info(f"🔗 从页面提取到 {len(links)} 个原始链接")
+            logger.log(detail, "🔗 从页面提取到 %d 个原始链接", len(links))
             
             # 过滤有效链接
             valid_links = set()
@@ -292,43 +2021,66 @@ class Link404Crawler:
                 if self.is_valid_url(link) and not self.is_static_resource(link):
                     valid_links.add(link)
             
-            logger.info(f"✅ 过滤后有效链接: {len(valid_links)} 个")
+            logger.log(detail, "✅ 过滤后有效链接: %d 个", len(valid_links))
             
             # 显示前几个链接作为样本
-            if valid_links:
-                logger.info(f"📋 链接样本 (前5个):")
+            if valid_links and logger.isEnabledFor(detail):
+                logger.log(detail, "📋 链接样本 (前5个):")
                 for i, link in enumerate(list(valid_links)[:5]):
-                    logger.info(f"  {i+1}. {link}")
+                    logger.log(detail, "  %d. %s", i + 1, link)
             
             page_links_status = []
+            resolved_positions = {}
             
             # 批量检查链接状态
             if links:
-                logger.info(f"🔍 检查 {len(links)} 个链接的状态...")
+                logger.log(detail, "🔍 检查 %d 个链接的状态...", len(links))
                 status_results = self.check_urls_batch(links)
                 
+                # 缓存中失效链接缺少位置信息时（延迟模式下上次是正常链接），重新下载解析页面
+                if page_validators == 'cached' and self._cached_positions_incomplete(link_positions, status_results):
+                    logger.log(detail, "🔄 页面缓存缺少失效链接的位置信息，重新下载解析: %s", url)
+                    page = self._load_page_links(url, use_validators=False)
+                    if page is None:
+                        return set()
+                    links, link_positions, title, page_validators = page
+                    status_results = self.check_urls_batch(links)
+                
                 # 处理结果
                 for link_url in links:
                     status = status_results.get(link_url, 'ERROR')
-                    position_info = link_positions.get(link_url, {
-                        'position': '未知位置', 
-                        'text': '', 
-                        'element_type': 'unknown',
-                        'classes_info': [],
-                        'element_id': '',
-                        'element_tag': '',
-                        'css_selector': '',
-                        'xpath': '',
-                        'visual_position': '未知区域'
-                    })
+                    position_info = link_positions.get(link_url)
+                    if position_info is not None:
+                        position_info = self._resolve_position_info(position_info, status)
+                    else:
+                        position_info = {
+                            'position': '未知位置', 
+                            'text': '', 
+                            'element_type': 'unknown',
+                            'classes_info': [],
+                            'element_id': '',
+                            'element_tag': '',
+                            'css_selector': '',
+                            'xpath': '',
+                            'visual_position': '未知区域',
+                            'identifiers': []
+                        }
                     
+                    resolved_positions[link_url] = position_info
                     link_status = self._create_link_status(url, link_url, status, position_info)
+                    self._observe_for_diff(link_url, status)
+                    if self.redirect_chains:
+                        self._note_redirect_parent(link_url, url)
                     page_links_status.append(link_status)
                     
                     # 处理404链接
                     if status == 404:
                         self._handle_404_link(url, link_url, position_info, link_status)
             
+            # 保存页面校验信息和链接，下次运行时可用条件请求跳过下载和解析（没有链接的页面也保存）
+            if isinstance(page_validators, dict):
+                self._save_page_cache(url, page_validators, resolved_positions, title)
+            
             # 保存页面详情
             self._save_page_details(url, links, page_links_status)
             
@@ -338,10 +2090,186 @@ class Link404Crawler:
             logger.error(f"提取链接时出错 {url}: {e}")
             return set()
     
+    def _fetch_page(self, url, use_validators=True):
+        """对页面发送一次GET请求，返回 (响应, 页面缓存)；请求失败时返回None
+        
+        启用页面缓存时发送 If-None-Match/If-Modified-Since。响应以流式方式读取，
+        非200的页面不会下载正文。
+        """
+        cached_page = None
+        headers = {}
+        if self.revalidate_pages and use_validators:
+            cached_page = self.status_store.get_page(url)
+            if cached_page is not None:
+                if cached_page['etag']:
+                    headers['If-None-Match'] = cached_page['etag']
+                if cached_page['last_modified']:
+                    headers['If-Modified-Since'] = cached_page['last_modified']
+        
+        try:
+            with self.metrics.timer('fetch'):
+                response = self._send_request('GET', url, headers=headers or None, stream=True)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"页面请求失败 {url}: {e}")
+            return None
+        
+        if response.status_code != 200:
+            response.close()
+        return response, cached_page
+    
+    @staticmethod
+    def _fetched_page_status(fetched):
+        """从 _fetch_page 的结果得到页面状态码；304且有页面缓存时视为200"""
+        if fetched is None:
+            return 'ERROR'
+        response, cached_page = fetched
+        if response.status_code == 304 and cached_page is not None:
+            return 200
+        return response.status_code
+    
+    def _load_page_links(self, url, use_validators=True, fetched=None):
+        """下载并解析页面，返回 (链接集合, 位置信息, 标题, 校验信息)；页面不可用时返回None
+        
+        返回304时直接使用上次保存的链接，此时校验信息为 'cached'。
+        发生重定向时以最终URL作为解析相对链接的基准。
+        """
+        if fetched is None:
+            fetched = self._fetch_page(url, use_validators)
+        if fetched is None:
+            return None
+        response, cached_page = fetched
+        
+        if response.status_code == 304 and cached_page is not None:
+            self.pages_not_modified += 1
+            link_positions = cached_page['links']
+            return set(link_positions), link_positions, cached_page['title'], 'cached'
+        
+        if response.status_code != 200:
+            logger.warning(f"⚠️ 页面访问失败: {url} (状态码: {response.status_code})")
+            return None
+        
+        links = set()
+        link_positions = {}
+        with self.metrics.timer('download'):
+            content = response.content
+        self.metrics.add_bytes(len(content))
+        title, canonical = self._parse_page_links(content, response.url or url, links, link_positions)
+        if canonical is not None:
+            self._register_canonical(url, canonical)
+        
+        validators = None
+        if self.revalidate_pages and not response.history:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                validators = {'etag': etag, 'last_modified': last_modified}
+        return links, link_positions, title, validators
+    
+    @staticmethod
+    def _cached_positions_incomplete(link_positions, status_results):
+        """判断缓存的链接中是否有失效链接缺少位置信息"""
+        for link_url, entry in link_positions.items():
+            status = status_results.get(link_url, 'ERROR')
+            if entry.get('lazy') and not (isinstance(status, int) and 200 <= status < 300):
+                return True
+        return False
+    
+    def _save_page_cache(self, url, validators, resolved_positions, title=None):
+        """把页面校验信息、标题和链接位置信息写入持久化存储"""
+        links_hash = hashlib.sha1('\n'.join(sorted(resolved_positions)).encode('utf-8')).hexdigest()
+        self.status_store.put_page(
+            url, validators['etag'], validators['last_modified'], links_hash, resolved_positions, title
+        )
+    
+    def _parse_page_links(self, content, base_url, links, link_positions):
+        """解析页面HTML并提取链接，返回 (页面标题, rel=canonical地址)"""
+        if self._parse_pool is not None:
+            try:
+                # 解析进程的耗时（解析+提取+进程间传输）整体计入 parse 阶段
+                with self.metrics.timer('parse'):
+                    title, canonical, records = self._parse_pool.submit(_parse_page_in_worker, content, base_url).result()
+            except Exception as e:
+                logger.warning(f"解析进程出错，改为在当前进程解析: {base_url} ({e})")
+            else:
+                for record in records:
+                    link_url = record[0]
+                    links.add(link_url)
+                    link_positions[link_url] = dict(zip(POSITION_FIELDS, record[1:]))
+                return title, canonical
+        
+        want_canonical = self.canonicalizer is not None and self.canonicalizer.honor_rel_canonical
+        
+        if self.html_parser == 'lxml':
+            try:
+                # 使用普通etree元素而非lxml.html元素，遍历父/子节点时开销更小
+                with self.metrics.timer('parse'):
+                    root = etree.fromstring(content, etree.HTMLParser())
+            except (etree.LxmlError, ValueError) as e:
+                logger.debug(f"lxml解析失败，改用BeautifulSoup: {base_url} ({e})")
+                root = None
+            if root is not None:
+                with self.metrics.timer('extract'):
+                    self._extract_links_from_elements(
+                        [LxmlElementAdapter(el) for el in root.xpath('//a[@href]')],
+                        [LxmlElementAdapter(el) for el in root.xpath('//img[@src]')],
+                        base_url, links, link_positions
+                    )
+                title = root.findtext('.//title')
+                canonical = None
+                if want_canonical:
+                    canonical = self._find_rel_canonical(
+                        (el.get('rel', ''), el.get('href')) for el in root.iter('link')
+                    )
+                return (title.strip() if title else title), canonical
+        
+        with self.metrics.timer('parse'):
+            soup = BeautifulSoup(content, 'html.parser')
+        with self.metrics.timer('extract'):
+            self._extract_links_from_soup(soup, base_url, links, link_positions)
+        canonical = None
+        if want_canonical:
+            canonical = self._find_rel_canonical(
+                (' '.join(el.get('rel', [])), el.get('href')) for el in soup.find_all('link', href=True)
+            )
+        # NavigableString 会引用整棵文档树，转成普通字符串后才能传回主进程、也不会让文档树常驻内存
+        title = soup.title.string if soup.title else None
+        return (str(title) if title is not None else None), canonical
+    
+    @staticmethod
+    def _find_rel_canonical(link_attrs):
+        """从 (rel, href) 序列中找出 rel=canonical 的地址"""
+        for rel, href in link_attrs:
+            if href and 'canonical' in rel.lower().split():
+                return href.strip()
+        return None
+    
+    def _register_canonical(self, url, href):
+        """页面声明的规范地址与当前URL不同时，记为重复页面，规范地址尚未爬取时等待加入爬取队列"""
+        if not href:
+            return
+        canonical = self.canonicalizer.canonicalize(urljoin(url, href))
+        if canonical == self.canonicalizer.canonicalize(url) or not self.is_valid_url(canonical):
+            return
+        with self._lock:
+            self.canonical_duplicates += 1
+            if canonical not in self.visited_urls:
+                self._canonical_targets.append(canonical)
+    
     def _extract_links_from_soup(self, soup, base_url, links, link_positions):
         """从BeautifulSoup对象中提取链接"""
+        self._extract_links_from_elements(
+            soup.find_all('a', href=True),
+            soup.find_all('img', src=True),
+            base_url, links, link_positions
+        )
+    
+    def _extract_links_from_elements(self, anchors, images, base_url, links, link_positions):
+        """从a/img元素中提取链接及其位置信息（元素需提供BeautifulSoup风格接口）"""
+        # 页面内共享的祖先信息缓存，导航菜单等同一容器下的链接只计算一次祖先
+        memo = {}
+        
         # 提取a标签链接
-        for link in soup.find_all('a', href=True):
+        for link in anchors:
             href = link['href'].strip()
             if href:
                 absolute_url = urljoin(base_url, href)
@@ -349,382 +2277,1023 @@ class Link404Crawler:
                     clean_url = absolute_url.split('#')[0]
                     links.add(clean_url)
                     if clean_url not in link_positions:
-                        position_data = self.detect_link_position_and_classes(link)
-                        link_positions[clean_url] = {
-                            'position': position_data['position'],
-                            'text': link.get_text(strip=True)[:50],
-                            'element_type': 'link',
-                            'classes_info': position_data['classes_info'],
-                            'element_id': position_data['element_id'],
-                            'element_tag': position_data['element_tag'],
-                            'css_selector': position_data['css_selector'],
-                            'xpath': position_data['xpath'],
-                            'visual_position': position_data['visual_position']
-                        }
+                        link_positions[clean_url] = self._position_entry(
+                            link, 'link', link.get_text(strip=True)[:50], memo
+                        )
         
         # 提取img标签链接
-        for img in soup.find_all('img', src=True):
+        for img in images:
             src = img['src'].strip()
             if src:
                 absolute_url = urljoin(base_url, src)
                 if self.is_valid_url(absolute_url):
                     links.add(absolute_url)
                     if absolute_url not in link_positions:
-                        position_data = self.detect_link_position_and_classes(img)
-                        link_positions[absolute_url] = {
-                            'position': position_data['position'],
-                            'text': img.get('alt', '')[:50],
-                            'element_type': 'image',
-                            'classes_info': position_data['classes_info'],
-                            'element_id': position_data['element_id'],
-                            'element_tag': position_data['element_tag'],
-                            'css_selector': position_data['css_selector'],
-                            'xpath': position_data['xpath'],
-                            'visual_position': position_data['visual_position']
-                        }
+                        link_positions[absolute_url] = self._position_entry(
+                            img, 'image', img.get('alt', '')[:50], memo
+                        )
+    
+    def _position_entry(self, element, element_type, text, memo):
+        """生成链接的位置信息；延迟模式下只保存元素引用，等状态检查后再决定是否计算"""
+        if self.lazy_link_metadata:
+            return {'element': element, 'element_type': element_type, 'text': text, 'memo': memo}
+        return self._build_position_info(element, element_type, text, memo)
+    
+    def _build_position_info(self, element, element_type, text, memo):
+        """计算完整的位置/选择器/XPath信息"""
+        position_data = self.detect_link_position_and_classes(element, memo)
+        return {
+            'position': position_data['position'],
+            'text': text,
+            'element_type': element_type,
+            'classes_info': position_data['classes_info'],
+            'element_id': position_data['element_id'],
+            'element_tag': position_data['element_tag'],
+            'css_selector': position_data['css_selector'],
+            'xpath': position_data['xpath'],
+            'visual_position': position_data['visual_position'],
+            'identifiers': position_data['identifiers']
+        }
+    
+    def _resolve_position_info(self, entry, status):
+        """延迟模式下按检查结果补全位置信息：只有非2xx链接才计算完整信息"""
+        if 'element' not in entry:
+            return entry
+        
+        element = entry['element']
+        if not (isinstance(status, int) and 200 <= status < 300):
+            return self._build_position_info(element, entry['element_type'], entry['text'], entry['memo'])
+        
+        # 正常链接只保留提取时已有的轻量信息
+        return {
+            'lazy': True,
+            'position': '',
+            'text': entry['text'],
+            'element_type': entry['element_type'],
+            'classes_info': [],
+            'element_id': element.get('id', '') or '',
+            'element_tag': element.name,
+            'css_selector': '',
+            'xpath': '',
+            'visual_position': '',
+            'identifiers': []
+        }
     
     def _create_link_status(self, parent_url, link_url, status, position_info):
         """创建链接状态对象"""
-        return {
-            'parent_page': parent_url,
-            'link_url': link_url,
-            'status_code': status,
-            'check_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'matches_filter': self.matches_path_filter(link_url),
-            'position': position_info['position'],
-            'link_text': position_info['text'],
-            'element_type': position_info['element_type'],
-            'classes_info': position_info.get('classes_info', []),
+        intern = self._interner.text
+        return LinkStatusRecord(
+            parent_page=intern(parent_url),
+            link_url=link_url,
+            status_code=status,
+            checked_at=int(time.time()),
+            matches_filter=self.matches_path_filter(link_url),
+            position=intern(position_info['position']),
+            link_text=position_info['text'],
+            element_type=intern(position_info['element_type']),
+            classes=self._interner.classes(position_info.get('classes_info', [])),
+            element_id=intern(position_info.get('element_id', '')),
+            element_tag=intern(position_info.get('element_tag', '')),
+            css_selector=intern(position_info.get('css_selector', '')),
+            xpath=intern(position_info.get('xpath', '')),
+            visual_position=intern(position_info.get('visual_position', ''))
+        )
+    
+    def _handle_404_link(self, parent_url, link_url, position_info, link_status):
+        """处理404链接 - 增强版"""
+        css_selector = position_info.get('css_selector', '未生成')
+        detail = self._detail_level
+        if logger.isEnabledFor(detail):
+            self._log_404_details(detail, link_url, position_info, css_selector)
+        
+        # 生成修复建议
+        fix_suggestion = self.generate_fix_suggestion({
+            'url': link_url,
+            'css_selector': css_selector,
             'element_id': position_info.get('element_id', ''),
-            'element_tag': position_info.get('element_tag', ''),
-            'css_selector': position_info.get('css_selector', ''),
-            'xpath': position_info.get('xpath', ''),
-            'visual_position': position_info.get('visual_position', '')
+            'classes_info': position_info.get('classes_info', []),
+            'visual_position': position_info['visual_position']
+        })
+        logger.log(detail, "         💡 修复建议: %s", fix_suggestion)
+        
+        # 添加到404列表
+        with self._lock:
+            self.found_404s.append(Link404Record(
+                url=link_url,
+                found_at=int(time.time()),
+                status_code=404,
+                parent_page=link_status.parent_page,
+                matches_filter=link_status.matches_filter,
+                position=link_status.position,
+                link_text=link_status.link_text,
+                element_type=link_status.element_type,
+                classes=link_status._classes,
+                element_id=link_status.element_id,
+                element_tag=link_status.element_tag,
+                css_selector=link_status.css_selector,
+                xpath=link_status.xpath,
+                visual_position=link_status.visual_position,
+                fix_suggestion=fix_suggestion
+            ))
+    
+    def _log_404_details(self, level, link_url, position_info, css_selector):
+        """输出404链接的位置、选择器、标识符和class层级（仅在该级别日志会输出时调用）"""
+        filter_indicator = "🎯" if self.matches_path_filter(link_url) else "⚪"
+        logger.log(level, "    %s ❌ 404: %s", filter_indicator, link_url)
+        logger.log(level, "         📍 位置: [%s]", position_info['visual_position'])
+        
+        # 显示增强的选择器信息
+        logger.log(level, "         🎯 CSS选择器: %s", css_selector)
+        
+        # 显示最近的标识符
+        identifiers = position_info.get('identifiers', [])
+        if identifiers:
+            logger.log(level, "         🏷️  最近的标识符:")
+            for identifier in identifiers[:3]:  # 显示最近的3个
+                level_desc = "当前元素" if identifier['level'] == 0 else f"父级-{identifier['level']}"
+                logger.log(level, "             %s: <%s> %s=\"%s\" → %s", level_desc, identifier['tag'],
+                           identifier['type'], identifier['value'], identifier['selector'])
+        
+        if position_info['text']:
+            logger.log(level, "         📝 文本: %s", position_info['text'])
+        
+        # 显示class信息
+        if position_info.get('classes_info'):
+            logger.log(level, "         🏷️  Class层级信息:")
+            for class_info in position_info['classes_info']:
+                logger.log(level, "             %s: <%s> class=\"%s\"", class_info['level'], class_info['tag'], class_info['classes'])
+    
+    def _save_page_details(self, url, links, page_links_status):
+        """保存页面详情；流式模式下直接追加到JSON Lines文件，不在内存中保留"""
+        page_detail = {
+            'page_url': url,
+            'total_links': len(links),
+            'links_status': page_links_status,
+            'scan_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
+        with self._lock:
+            if self._page_details_file is not None:
+                self._page_details_file.write(json.dumps(page_detail, ensure_ascii=False, default=record_to_json) + '\n')
+                self._page_details_file.flush()
+            else:
+                self.page_link_details.append(page_detail)
+        
+        # 统计404链接
+        status_404_count = sum(1 for link_status in page_links_status 
+                              if link_status['status_code'] == 404)
+        
+        if status_404_count > 0:
+            logger.log(self._detail_level, "  📊 发现 %d 个404链接", status_404_count)
+    
+    def print_final_summary(self):
+        """打印最终统计摘要"""
+        total_404s = len(self.found_404s)
+        filtered_404s = sum(1 for link in self.found_404s if link['matches_filter'])
+        total_pages = len(self.visited_urls)
+        total_links = len(self.all_links)
+        
+        logger.info("\n" + "=" * 80)
+        logger.info("🎯 检测完成 - 最终统计")
+        logger.info("=" * 80)
+        logger.info(f"📄 已检测页面: {total_pages}")
+        logger.info(f"🔗 发现链接总数: {total_links}")
+        logger.info(f"❌ 404链接总数: {total_404s}")
+        logger.info(f"🎯 符合筛选条件的404链接: {filtered_404s}")
+        if self.status_cache is not None:
+            logger.info(f"🗃️ 状态缓存: {len(self.status_cache)} 个URL, 命中 {self.status_cache.hits} 次, 实际请求 {self.status_cache.misses} 次")
+        if self.status_store is not None:
+            store = self.status_store
+            logger.info(f"💾 持久化存储: 有效期内复用 {store.fresh_hits} 个, 条件请求验证 {store.revalidated} 个, 重新检查 {store.fetched} 个")
+            if self.revalidate_pages:
+                logger.info(f"♻️ 未修改页面(304): {self.pages_not_modified} 个")
+        
+        if self.rate_limiter is not None:
+            rates = ', '.join(f"{host}={rate:.1f}/s" for host, rate in self.rate_limiter.current_rates().items())
+            logger.info(f"🚦 限速: 被限流响应 {self.rate_limiter.throttled_responses} 次, 当前速率 {rates}")
+        snapshot = self.metrics.snapshot()
+        if snapshot['phases']:
+            logger.info(f"⏱️ 阶段耗时 (次数 / 平均 / P95):")
+            for phase, stats in snapshot['phases'].items():
+                logger.info(f"  {phase}: {stats['count']} 次 / {stats['avg_seconds'] * 1000:.1f}ms / {stats['p95_seconds'] * 1000:.0f}ms")
+            logger.info(f"📶 请求 {snapshot['requests_total']} 次, 下载页面 {snapshot['bytes_downloaded'] / 1024:.0f} KB, 状态分布: {snapshot['requests']}")
+        if self.redirect_chains:
+            chains = list(self.redirect_chains.values())
+            logger.info(f"🔀 重定向: {len(chains)} 个URL发生跳转, 长链(≥{self.long_redirect_chain}跳) "
+                        f"{sum(1 for chain in chains if chain['long'])} 个, 循环 {sum(1 for chain in chains if chain['loop'])} 个, "
+                        f"跳转缓存命中 {self.redirect_hop_cache_hits} 次")
+        if self.diff_baseline is not None:
+            counts = self._diff_counts(self.build_diff_report())
+            logger.info(f"🆚 与上次运行对比: 新增失效 {counts['newly_broken']} 个, 仍然失效 {counts['still_broken']} 个, "
+                        f"已修复 {counts['fixed']} 个, 状态变化 {counts['changed']} 个, 本次未遇到 {counts['not_seen']} 个")
+            logger.info(f"♻️ 复用上次正常的链接状态: {self.diff_baseline.reused} 次")
+        if self.canonicalizer is not None and self.canonicalizer.honor_rel_canonical:
+            logger.info(f"🧭 rel=canonical 指向其他地址的重复页面: {self.canonical_duplicates} 个")
+        if self.use_sitemaps:
+            logger.info(f"🗺️ 站点地图种子URL: {self.sitemap_pages_seeded} 个")
+        if self.head_fallbacks:
+            logger.info(f"🔁 HEAD改用GET: {self.head_fallbacks} 次, 只用GET检查的域名: {', '.join(sorted(self._get_only_hosts)) or '无'}")
+        
+        if total_404s > 0:
+            # 按位置分组统计
+            position_stats = {}
+            for link in self.found_404s:
+                pos = link.get('visual_position', '未知区域')
+                position_stats[pos] = position_stats.get(pos, 0) + 1
+            
+            logger.info("\n📊 404链接位置分布:")
+            for position, count in sorted(position_stats.items(), key=lambda x: x[1], reverse=True):
+                logger.info(f"  {position}: {count} 个")
+        
+        logger.info("=" * 80)
+    
+    def crawl_for_404s(self, start_url=None):
+        """爬取域名下的所有链接并检测404"""
+        if start_url is None:
+            start_url = self._get_start_url()
+        
+        self._print_crawl_info(start_url)
+        start_url = self._apply_path_filter_to_start_url(start_url)
+        if self.canonicalizer is not None:
+            start_url = self.canonicalizer.canonicalize(start_url)
+        
+        self._start_url = start_url
+        self.url_queue = self._create_frontier([start_url])
+        self.pages_crawled = 0
+        if self.checkpoint_path and self.status_cache is not None:
+            self._ckpt_cache_pos = self.status_cache.track_changes()
+        resumed = self.resume and self.load_checkpoint()
+        if self.use_sitemaps and not resumed:
+            self.seed_frontier_from_sitemaps()
+        if self.stream_reports and self._page_details_file is None:
+            self._open_page_details_stream(self.page_details_path)
+        
+        if self._metrics_exporter is not None:
+            self._metrics_exporter.start()
+        if self.log_mode == 'quiet':
+            self._progress = CrawlProgress(self.max_pages, self.log_every)
+        
+        if self.parse_workers > 0:
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                initializer=_init_parse_worker,
+                initargs=(self.domain, self.path_filter, self.html_parser, self.canonicalization)
+            )
+        
+        try:
+            if self.engine == 'async':
+                asyncio.run(self._crawl_async())
+            else:
+                self._crawl_sync()
+        except BaseException:
+            # 中断或异常时保存断点，便于 --resume 继续
+            self.save_checkpoint()
+            raise
+        finally:
+            if self._progress is not None:
+                self._progress.finish()
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown(wait=True, cancel_futures=True)
+                self._parse_pool = None
+        
+        self._clear_checkpoint()
+    
+    def _crawl_sync(self):
+        """同步爬取引擎：逐页处理"""
+        url_queue = self.url_queue
+        
+        while url_queue and self.pages_crawled < self.max_pages:
+            current_url = url_queue.popleft()
+            
+            if not self._should_crawl(current_url):
+                continue
+            
+            self.visited_urls.add(current_url)
+            self.pages_crawled += 1
+            
+            logger.log(self._detail_level, "🎯 当前队列长度: %d, 已访问页面: %d", len(url_queue), len(self.visited_urls))
+            logger.log(self._detail_level, "\n📖 正在爬取第 %d/%d 页: %s", self.pages_crawled, self.max_pages, current_url)
+            
+            self._inflight_urls.add(current_url)
+            links = self._crawl_page(current_url)
+            self._inflight_urls.discard(current_url)
+            self._page_completed(current_url)
+            if links is None:
+                continue
+            
+            self._enqueue_links(links, url_queue)
+            
+            if self.delay > 0 and self.rate_limiter is None:
+                time.sleep(self.delay)
+    
+    async def _crawl_async(self):
+        """异步爬取引擎：同时保持最多 max_inflight_pages 个页面在处理中"""
+        url_queue = self.url_queue
+        in_flight = set()
+        
+        page_executor = ThreadPoolExecutor(max_workers=self.max_inflight_pages)
+        self._link_executor = self._shared_link_executor or ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while url_queue or in_flight:
+                # 填满在途页面槽位
+                while url_queue and len(in_flight) < self.max_inflight_pages and self.pages_crawled < self.max_pages:
+                    current_url = url_queue.popleft()
+                    
+                    if not self._should_crawl(current_url):
+                        continue
+                    
+                    self.visited_urls.add(current_url)
+                    self._inflight_urls.add(current_url)
+                    self.pages_crawled += 1
+                    
+                    logger.log(self._detail_level, "🎯 当前队列长度: %d, 在途页面: %d, 已访问页面: %d",
+                               len(url_queue), len(in_flight) + 1, len(self.visited_urls))
+                    logger.log(self._detail_level, "\n📖 正在爬取第 %d/%d 页: %s", self.pages_crawled, self.max_pages, current_url)
+                    
+                    in_flight.add(asyncio.create_task(
+                        self._crawl_page_async(current_url, page_executor)
+                    ))
+                
+                if not in_flight:
+                    break
+                
+                _, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in in_flight:
+                task.cancel()
+            page_executor.shutdown(wait=True)
+            if self._link_executor is not self._shared_link_executor:
+                self._link_executor.shutdown(wait=True)
+            self._link_executor = None
+    
+    async def _crawl_page_async(self, url, page_executor):
+        """在线程池中处理单个页面，解析完成后立即把新链接送回队列"""
+        loop = asyncio.get_running_loop()
+        try:
+            links = await loop.run_in_executor(page_executor, self._crawl_page, url)
+        except Exception as e:
+            logger.error(f"爬取页面时出错 {url}: {e}")
+            links = None
+        
+        # 在事件循环线程中修改队列，无需加锁
+        self._inflight_urls.discard(url)
+        self._page_completed(url)
+        if links is None:
+            return
+        
+        self._enqueue_links(links, self.url_queue)
+        
+        if self.delay > 0 and self.rate_limiter is None:
+            await asyncio.sleep(self.delay)
+    
+    def _page_completed(self, url=None):
+        """页面处理完成后更新运行指标，并按间隔保存断点"""
+        metrics = self.metrics
+        metrics.set_gauge('pages_crawled', self.pages_crawled)
+        metrics.set_gauge('queue_depth', len(self.url_queue))
+        metrics.set_gauge('pages_in_flight', len(self._inflight_urls))
+        metrics.set_gauge('found_404s', len(self.found_404s))
+        if self._progress is not None:
+            self._progress.update(self.pages_crawled, len(self.found_404s), len(self.url_queue), url)
+        
+        if not self.checkpoint_path:
+            return
+        self._pages_since_checkpoint += 1
+        if self._pages_since_checkpoint >= self.checkpoint_interval:
+            self.save_checkpoint()
+    
+    def save_checkpoint(self):
+        """保存爬取断点
+        
+        结果（404记录、页面详情、新发现的链接、新的链接状态）只把上次保存以来新增的部分追加到
+        结果文件；断点文件只保存队列、已访问集合和结果文件的有效长度，每次保存的开销不再随结果数量增长。
+        """
+        if not self.checkpoint_path:
+            return
+        
+        try:
+            with self._lock:
+                # 仍在处理中的页面结果不完整，恢复时重新放回队列，它们的结果留到下次保存
+                in_flight = set(self._inflight_urls)
+                new_404s = self._ckpt_deferred_404s + self.found_404s[self._ckpt_404_pos:]
+                new_details = self._ckpt_deferred_details + self.page_link_details[self._ckpt_details_pos:]
+                self._ckpt_404_pos = len(self.found_404s)
+                self._ckpt_details_pos = len(self.page_link_details)
+                self._ckpt_deferred_404s = [item for item in new_404s
+                                            if self._404_source_page(item) in in_flight]
+                self._ckpt_deferred_details = [page for page in new_details
+                                               if page['page_url'] in in_flight]
+                new_links, self._ckpt_new_links = self._ckpt_new_links, []
+                pages_crawled = self.pages_crawled - len(in_flight)
+                url_queue = list(in_flight) + list(self.url_queue)
+                visited_urls = [url for url in self.visited_urls if url not in in_flight]
+            
+            chunk = {
+                'found_404s': [item for item in new_404s if self._404_source_page(item) not in in_flight],
+                'page_link_details': [page for page in new_details if page['page_url'] not in in_flight],
+                'all_links': new_links,
+                'status_cache': {}
+            }
+            if self.status_cache is not None:
+                chunk['status_cache'], self._ckpt_cache_pos = self.status_cache.changes_since(self._ckpt_cache_pos)
+            
+            # 先追加结果，再原子替换断点文件；中途被结束时，断点文件记录的偏移之后的内容在恢复时丢弃
+            mode = 'a' if self._ckpt_results_offset is not None else 'w'
+            with open(self.checkpoint_results_path, mode, encoding='utf-8') as f:
+                f.write(json.dumps(chunk, ensure_ascii=False, default=record_to_json) + '\n')
+                f.flush()
+                self._ckpt_results_offset = f.tell()
+            
+            data = {
+                'version': 2,
+                'domain': self.domain,
+                'path_filter': self.path_filter,
+                'saved_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'pages_crawled': pages_crawled,
+                'url_queue': url_queue,
+                'visited_urls': visited_urls,
+                'page_details_path': self.page_details_path,
+                'results_offset': self._ckpt_results_offset
+            }
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.checkpoint_path)
+            self._pages_since_checkpoint = 0
+            logger.info(f"💾 断点已保存: {self.checkpoint_path} (已爬取 {pages_crawled} 页, 队列 {len(url_queue)} 个)")
+        except Exception as e:
+            logger.error(f"保存断点时出错: {e}")
+    
+    @staticmethod
+    def _404_source_page(item):
+        """返回产生该404记录的页面URL"""
+        return item['url'] if item['element_type'] == 'page' else item['parent_page']
+    
+    def load_checkpoint(self):
+        """从断点文件恢复爬取状态，成功返回True"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            logger.warning(f"⚠️ 未找到断点文件 {self.checkpoint_path}，将从头开始爬取")
+            return False
+        
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"❌ 读取断点文件失败: {e}")
+            return False
+        
+        if data.get('domain') != self.domain or data.get('path_filter') != self.path_filter:
+            logger.warning(f"⚠️ 断点文件属于 {data.get('domain')} (路径筛选: {data.get('path_filter')})，与当前配置不一致，忽略")
+            return False
+        
+        if data.get('version', 1) >= 2:
+            try:
+                results = self._read_checkpoint_results(data['results_offset'])
+            except Exception as e:
+                logger.error(f"❌ 读取断点结果文件失败: {e}")
+                return False
+        else:
+            # 旧版断点文件：结果直接保存在断点文件中，下次保存时全部写入新的结果文件
+            results = {key: data.get(key) or default for key, default in
+                       (('found_404s', []), ('page_link_details', []), ('all_links', []), ('status_cache', {}))}
+            self._ckpt_results_offset = None
+        
+        self.url_queue = self._create_frontier(data['url_queue'])
+        self.pages_crawled = data['pages_crawled']
+        self.visited_urls = set(data['visited_urls'])
+        self.all_links = set(results['all_links'])
+        self.found_404s = results['found_404s']
+        self.page_link_details = results['page_link_details']
+        if self.stream_reports and data.get('page_details_path'):
+            # 继续追加到中断前的页面详情文件
+            self.page_details_path = data['page_details_path']
+        if self._ckpt_results_offset is not None:
+            self._ckpt_404_pos = len(self.found_404s)
+            self._ckpt_details_pos = len(self.page_link_details)
+            if self.status_cache is not None:
+                self.status_cache.load(results['status_cache'])
+        else:
+            self._ckpt_new_links = list(self.all_links)
+            if self.status_cache is not None:
+                for url, (status, checked_at) in results['status_cache'].items():
+                    self.status_cache.put(url, status, checked_at)
+        
+        logger.info(f"♻️ 已从断点恢复: {self.checkpoint_path} (保存于 {data['saved_at']})")
+        logger.info(f"   已爬取 {self.pages_crawled} 页, 队列剩余 {len(self.url_queue)} 个, 已发现 {len(self.found_404s)} 个404")
+        return True
+    
+    def _read_checkpoint_results(self, offset):
+        """读取结果文件中断点偏移之前的内容并合并，偏移之后未确认的部分会被截掉"""
+        results = {'found_404s': [], 'page_link_details': [], 'all_links': [], 'status_cache': {}}
+        with open(self.checkpoint_results_path, 'r+b') as f:
+            for line in f.read(offset).splitlines():
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                results['found_404s'].extend(chunk['found_404s'])
+                results['page_link_details'].extend(chunk['page_link_details'])
+                results['all_links'].extend(chunk['all_links'])
+                results['status_cache'].update(chunk['status_cache'])
+            f.truncate(offset)
+        self._ckpt_results_offset = offset
+        return results
+    
+    def _clear_checkpoint(self):
+        """爬取正常结束后删除断点文件和结果文件"""
+        for path in (self.checkpoint_path, self.checkpoint_results_path):
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"删除断点文件失败: {e}")
     
-    def _handle_404_link(self, parent_url, link_url, position_info, link_status):
-        """处理404链接 - 增强版"""
-        filter_indicator = "🎯" if self.matches_path_filter(link_url) else "⚪"
-        logger.info(f"    {filter_indicator} ❌ 404: {link_url}")
-        logger.info(f"         📍 位置: [{position_info['visual_position']}]")
+    def _should_crawl(self, url):
+        """判断从队列取出的URL是否需要爬取"""
+        if url in self.visited_urls:
+            return False
         
-        # 显示增强的选择器信息
-        css_selector = position_info.get('css_selector', '未生成')
-        logger.info(f"         🎯 CSS选择器: {css_selector}")
+        # 🔧 关键优化：在处理前就检查路径筛选
+        if self.path_filter and not self.matches_path_filter(url):
+            logger.log(self._detail_level, "⏭️  跳过不符合筛选条件的URL: %s", url)
+            return False
         
-        # 显示最近的标识符
-        if hasattr(self, '_current_element'):
-            identifiers = self._get_nearest_identifier(self._current_element)
-            if identifiers:
-                logger.info(f"         🏷️  最近的标识符:")
-                for identifier in identifiers[:3]:  # 显示最近的3个
-                    level_desc = "当前元素" if identifier['level'] == 0 else f"父级-{identifier['level']}"
-                    logger.info(f"             {level_desc}: <{identifier['tag']}> {identifier['type']}=\"{identifier['value']}\" → {identifier['selector']}")
+        return True
+    
+    def _crawl_page(self, current_url):
+        """检测单个页面，返回页面中的有效链接；页面不可解析时返回None
         
-        if position_info['text']:
-            logger.info(f"         📝 文本: {position_info['text']}")
+        页面只请求一次：同一个GET响应同时提供状态码、重定向后的最终URL和正文。
+        作为链接检查过的页面（状态已在缓存中）且状态非200时不再请求。
+        """
+        fetched, status = self._fetch_page_with_status(current_url)
         
-        # 显示class信息
-        if position_info.get('classes_info'):
-            logger.info(f"         🏷️  Class层级信息:")
-            for class_info in position_info['classes_info']:
-                logger.info(f"             {class_info['level']}: <{class_info['tag']}> class=\"{class_info['classes']}\"")
+        if status == 200 and fetched is None:
+            # 状态来自此前的链接检查，仍需下载正文
+            fetched = self._fetch_page(current_url)
+            status = self._fetched_page_status(fetched)
         
-        # 生成修复建议
-        fix_suggestion = self.generate_fix_suggestion({
-            'url': link_url,
-            'css_selector': css_selector,
-            'element_id': position_info.get('element_id', ''),
-            'classes_info': position_info.get('classes_info', []),
-            'visual_position': position_info['visual_position']
-        })
-        logger.info(f"         💡 修复建议: {fix_suggestion}")
+        if fetched is not None:
+            self._record_final_url(current_url, fetched[0], status)
+            self._record_page_redirects(current_url, fetched[0], status)
+        self._observe_for_diff(current_url, status)
         
-        # 添加到404列表
-        with self._lock:
-            self.found_404s.append({
-                'url': link_url,
-                'found_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'status_code': 404,
-                'parent_page': parent_url,
-                'matches_filter': self.matches_path_filter(link_url),
-                'position': position_info['position'],
-                'link_text': position_info['text'],
-                'element_type': position_info['element_type'],
-                'classes_info': position_info.get('classes_info', []),
-                'element_id': position_info.get('element_id', ''),
-                'element_tag': position_info.get('element_tag', ''),
-                'css_selector': position_info.get('css_selector', ''),
-                'xpath': position_info.get('xpath', ''),
-                'visual_position': position_info.get('visual_position', ''),
-                'fix_suggestion': fix_suggestion
-            })
+        if status == 404:
+            self._handle_404_page(current_url)
+        elif status == 'ERROR':
+            logger.warning(f"⚠️  页面状态: 访问错误")
+            if current_url == self._start_url:
+                logger.warning(f"⚠️  起始URL无法访问，请检查网络连接或域名是否正确")
+        elif status == 200:
+            # 提取并检查页面链接
+            links = self.extract_and_check_links_from_page(current_url, fetched)
+            with self._lock:
+                if self.checkpoint_path:
+                    self._ckpt_new_links.extend(set(links) - self.all_links)
+                self.all_links.update(links)
+            return links
+        else:
+            logger.log(self._detail_level, "  ⚠️  页面状态: %s", status)
+        
+        return None
     
-    def _save_page_details(self, url, links, page_links_status):
-        """保存页面详情"""
-        with self._lock:
-            self.page_link_details.append({
-                'page_url': url,
-                'total_links': len(links),
-                'links_status': page_links_status,
-                'scan_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            })
+    def _fetch_page_with_status(self, url):
+        """通过状态缓存请求页面，返回 (fetch结果或None, 状态码)
         
-        # 统计404链接
-        status_404_count = sum(1 for link_status in page_links_status 
-                              if link_status['status_code'] == 404)
+        并发的链接检查与页面请求共享同一个缓存条目，同一URL不会被同时请求两次。
+        """
+        fetched = []
         
-        if status_404_count > 0:
-            logger.info(f"  📊 发现 {status_404_count} 个404链接")
-    
-    def print_final_summary(self):
-        """打印最终统计摘要"""
-        total_404s = len(self.found_404s)
-        filtered_404s = sum(1 for link in self.found_404s if link['matches_filter'])
-        total_pages = len(self.visited_urls)
-        total_links = len(self.all_links)
+        def fetch(page_url):
+            fetched.append(self._fetch_page(page_url))
+            return self._fetched_page_status(fetched[0])
         
-        logger.info("\n" + "=" * 80)
-        logger.info("🎯 检测完成 - 最终统计")
-        logger.info("=" * 80)
-        logger.info(f"📄 已检测页面: {total_pages}")
-        logger.info(f"🔗 发现链接总数: {total_links}")
-        logger.info(f"❌ 404链接总数: {total_404s}")
-        logger.info(f"🎯 符合筛选条件的404链接: {filtered_404s}")
+        if self.status_cache is None:
+            status = fetch(url)
+        else:
+            status = self.status_cache.get_or_check(url, fetch)
         
-        if total_404s > 0:
-            # 按位置分组统计
-            position_stats = {}
-            for link in self.found_404s:
-                pos = link.get('visual_position', '未知区域')
-                position_stats[pos] = position_stats.get(pos, 0) + 1
-            
-            logger.info("\n📊 404链接位置分布:")
-            for position, count in sorted(position_stats.items(), key=lambda x: x[1], reverse=True):
-                logger.info(f"  {position}: {count} 个")
+        if fetched and self.status_store is not None and isinstance(status, int):
+            self.status_store.put(url, status)
+        return (fetched[0] if fetched else None), status
+    
+    def _record_final_url(self, url, response, status):
+        """页面发生重定向时，缓存最终URL的状态并标记为已访问，避免再次请求"""
+        final_url = response.url
+        if not response.history or not final_url or final_url == url:
+            return
+        if self.status_cache is not None and isinstance(status, int):
+            self.status_cache.put(final_url, status)
+        with self._lock:
+            self.visited_urls.add(self._crawl_key(final_url))
+    
+    def _record_page_redirects(self, url, response, status):
+        """页面请求由 requests 跟随重定向，跳转路径直接取自 response.history，不额外请求"""
+        if not response.history or url in self.redirect_chains:
+            return
+        chain = [(hop.url, hop.status_code) for hop in response.history]
+        chain.append((response.url, response.status_code))
+        self._record_redirect_chain(url, chain, status)
+    
+    def _create_frontier(self, urls=()):
+        """创建爬取队列"""
+        frontier = CrawlFrontier(
+            use_bloom=self.use_bloom_filter,
+            expected_urls=max(self.max_pages * 50, 10000)
+        )
+        for url in urls:
+            frontier.append(url, self._link_priority(url))
+        return frontier
+    
+    def _link_priority(self, url):
+        """计算链接在队列中的优先级，数值越小越先爬取"""
+        if self.frontier_priority == 'depth':
+            return urlparse(url).path.rstrip('/').count('/')
+        return 0
+    
+    def _crawl_key(self, url):
+        """爬取队列和已访问集合使用的URL：开启规范化时取规范形式"""
+        if self.canonicalizer is None:
+            return url
+        return self.canonicalizer.canonicalize(url)
+    
+    def _frontier_links(self, links):
+        """把页面链接换成爬取队列使用的URL，并附上页面声明、尚未爬取的 rel=canonical 地址
         
-        logger.info("=" * 80)
+        链接检查和报告仍使用原始地址，这里只影响哪些页面会被爬取。
+        """
+        if self.canonicalizer is None:
+            return links
+        with self._lock:
+            targets, self._canonical_targets = self._canonical_targets, []
+        frontier_links = dict.fromkeys(map(self.canonicalizer.canonicalize, links))
+        frontier_links.update(dict.fromkeys(targets))
+        return list(frontier_links)
     
-    def crawl_for_404s(self, start_url=None):
-        """爬取域名下的所有链接并检测404"""
-        if start_url is None:
-            start_url = self._get_start_url()
+    def _enqueue_links(self, links, url_queue):
+        """将新发现的链接加入爬取队列"""
+        # 🔧 只将符合 /au 路径筛选条件的链接加入队列
+        new_links_added = 0
+        filtered_links_added = 0
         
-        self._print_crawl_info(start_url)
+        for link in self._frontier_links(links):
+            if link not in self.visited_urls and link not in url_queue:
+                new_links_added += 1
+                # 检查链接是否符合 /au 路径筛选条件
+                if not self.path_filter or self.matches_path_filter(link):
+                    url_queue.append(link, self._link_priority(link))
+                    filtered_links_added += 1
+                else:
+                    # 记录为已处理，之后再次出现时不必重复判断
+                    url_queue.mark_seen(link)
         
-        # 🔧 针对 /au 路径的特殊处理
-        if self.path_filter and not start_url.endswith(self.path_filter.lstrip('/')):
-            # 如果起始URL不包含筛选路径，自动添加
-            parsed = urlparse(start_url)
-            start_url = f"{parsed.scheme}://{parsed.netloc}{self.path_filter}"
-            logger.info(f"🎯 自动调整起始URL为: {start_url}")
+        detail = self._detail_level
+        logger.log(detail, "🔗 发现 %d 个新链接", new_links_added)
+        logger.log(detail, "✅ 其中 %d 个符合 /au 路径条件，已加入队列", filtered_links_added)
         
-        url_queue = deque([start_url])
-        pages_crawled = 0
+        if self.path_filter and filtered_links_added < new_links_added:
+            skipped = new_links_added - filtered_links_added
+            logger.log(detail, "⏭️  跳过 %d 个不在 /au 路径下的链接", skipped)
+    
+    def seed_frontier_from_sitemaps(self):
+        """把站点地图中符合条件的页面URL批量加入爬取队列，返回加入的数量"""
+        sitemaps = self.sitemap_urls or self._discover_sitemaps()
+        logger.info(f"🗺️ 从 {len(sitemaps)} 个站点地图加载URL...")
         
-        while url_queue and pages_crawled < self.max_pages:
-            current_url = url_queue.popleft()
-            
-            if current_url in self.visited_urls:
-                continue
-            
-            # 🔧 关键优化：在处理前就检查路径筛选
-            if self.path_filter and not self.matches_path_filter(current_url):
-                logger.info(f"⏭️  跳过不符合筛选条件的URL: {current_url}")
+        urls = self.iter_sitemap_urls(sitemaps)
+        if self.canonicalizer is not None:
+            urls = map(self.canonicalizer.canonicalize, urls)
+        candidates = (
+            url for url in urls
+            if url not in self.visited_urls and self.is_valid_url(url)
+            and (not self.path_filter or self.matches_path_filter(url))
+        )
+        added = self.url_queue.extend(candidates, self._link_priority)
+        self.sitemap_pages_seeded += added
+        logger.info(f"🗺️ 从站点地图加入 {added} 个URL，队列长度: {len(self.url_queue)}")
+        return added
+    
+    def _discover_sitemaps(self):
+        """读取 robots.txt 中的 Sitemap 声明；没有声明时使用 /sitemap.xml"""
+        robots_url = urljoin(self.base_url + '/', '/robots.txt')
+        sitemaps = []
+        try:
+            response = self._send_request('GET', robots_url)
+            if response.status_code == 200:
+                for line in response.text.splitlines():
+                    key, _, value = line.partition(':')
+                    if key.strip().lower() == 'sitemap' and value.strip():
+                        sitemaps.append(value.strip())
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"读取robots.txt失败 {robots_url}: {e}")
+        
+        if not sitemaps:
+            sitemaps.append(urljoin(self.base_url + '/', '/sitemap.xml'))
+        return sitemaps
+    
+    def iter_sitemap_urls(self, sitemaps):
+        """逐个产出站点地图中的页面URL；sitemap索引中的子站点地图会继续展开"""
+        pending = deque(sitemaps)
+        seen = set()
+        while pending:
+            sitemap_url = pending.popleft()
+            if sitemap_url in seen:
                 continue
+            seen.add(sitemap_url)
             
-            self.visited_urls.add(current_url)
-            pages_crawled += 1
-            
-            logger.info(f"🎯 当前队列长度: {len(url_queue)}, 已访问页面: {len(self.visited_urls)}")
-            logger.info(f"\n📖 正在爬取第 {pages_crawled}/{self.max_pages} 页: {current_url}")
+            for kind, loc in self._iter_sitemap_locs(sitemap_url):
+                if kind == 'sitemap':
+                    pending.append(loc)
+                else:
+                    yield loc
+    
+    def _iter_sitemap_locs(self, sitemap_url):
+        """流式解析单个站点地图，产出 ('url'|'sitemap', loc)
+        
+        响应按块读取并送入增量解析器，处理完的元素立即清除，大型站点地图不会整体载入内存；
+        gzip 压缩的站点地图（.xml.gz）按文件头自动解压。
+        """
+        try:
+            response = self._send_request('GET', sitemap_url, stream=True)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"读取站点地图失败 {sitemap_url}: {e}")
+            return
+        
+        with response:
+            if response.status_code != 200:
+                logger.warning(f"⚠️ 站点地图不可用: {sitemap_url} (状态码: {response.status_code})")
+                return
             
-            status = self.check_url_status(current_url)
+            parser = ElementTree.XMLPullParser(events=('start', 'end'))
+            decompressor = None
+            root = None
+            count = 0
+            try:
+                for i, chunk in enumerate(response.iter_content(chunk_size=64 * 1024)):
+                    if i == 0 and chunk[:2] == b'\x1f\x8b':
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+                    
+                    for event, elem in parser.read_events():
+                        if root is None:
+                            root = elem
+                            continue
+                        if event != 'end':
+                            continue
+                        tag = elem.tag.rpartition('}')[2]
+                        if tag in ('url', 'sitemap'):
+                            for child in elem:
+                                if child.tag.rpartition('}')[2] == 'loc' and child.text:
+                                    count += 1
+                                    yield tag, child.text.strip()
+                                    break
+                            root.clear()
+                parser.close()
+            except (ElementTree.ParseError, zlib.error, requests.exceptions.RequestException) as e:
+                logger.warning(f"解析站点地图出错 {sitemap_url}: {e}")
             
-            if status == 404:
-                self._handle_404_page(current_url)
-            elif status == 'ERROR':
-                logger.warning(f"⚠️  页面状态: 访问错误")
-            elif status == 200:
-                # 提取并检查页面链接
-                links = self.extract_and_check_links_from_page(current_url)
-                self.all_links.update(links)
-                
-                # 🔧 只将符合 /au 路径筛选条件的链接加入队列
-                new_links_added = 0
-                filtered_links_added = 0
-                
-                for link in links:
-                    if link not in self.visited_urls and link not in url_queue:
-                        new_links_added += 1
-                        # 检查链接是否符合 /au 路径筛选条件
-                        if not self.path_filter or self.matches_path_filter(link):
-                            url_queue.append(link)
-                            filtered_links_added += 1
-                
-                logger.info(f"🔗 发现 {new_links_added} 个新链接")
-                logger.info(f"✅ 其中 {filtered_links_added} 个符合 /au 路径条件，已加入队列")
-                
-                if self.path_filter and filtered_links_added < new_links_added:
-                    skipped = new_links_added - filtered_links_added
-                    logger.info(f"⏭️  跳过 {skipped} 个不在 /au 路径下的链接")
-                
-                if self.delay > 0:
-                    time.sleep(self.delay)
-            else:
-                logger.info(f"  ⚠️  页面状态: {status}")
+            logger.info(f"🗺️ 站点地图 {sitemap_url}: {count} 条")
     
     def _get_start_url(self):
         """获取起始URL"""
         return self.base_url
     
+    def _apply_path_filter_to_start_url(self, start_url):
+        """有路径筛选时把起始URL调整到筛选路径下
+        
+        路径筛选为多个路径（列表）时，起始URL已符合其中任一路径则保持不变，否则使用第一个路径。
+        """
+        if not self.path_filter:
+            return start_url
+        if isinstance(self.path_filter, list):
+            if self.matches_path_filter(start_url):
+                return start_url
+            prefix = self.path_filter[0]
+        else:
+            prefix = self.path_filter
+            # 🔧 针对 /au 路径的特殊处理
+            if start_url.endswith(prefix.lstrip('/')):
+                return start_url
+        # 如果起始URL不包含筛选路径，自动添加
+        parsed = urlparse(start_url)
+        start_url = f"{parsed.scheme}://{parsed.netloc}{prefix if prefix.startswith('/') else '/' + prefix}"
+        logger.info(f"🎯 自动调整起始URL为: {start_url}")
+        return start_url
+    
     def _print_crawl_info(self, start_url):
         """打印爬取信息"""
         logger.info(f"\n🚀 开始404链接检测")
         logger.info(f"🌐 目标域名: {self.domain}")
         logger.info(f"📄 最大页面数: {self.max_pages}")
         logger.info(f"🔄 并发线程数: {self.max_workers}")
+        if self.engine == 'async':
+            logger.info(f"⚡ 爬取引擎: 异步 (最多 {self.max_inflight_pages} 个页面同时处理)")
+        else:
+            logger.info(f"🐢 爬取引擎: 同步 (逐页处理)")
+        if self.parse_workers > 0:
+            logger.info(f"🧩 解析进程数: {self.parse_workers}")
+        if self.canonicalizer is not None:
+            logger.info(f"🧭 URL规范化: 末尾斜杠={self.canonicalizer.trailing_slash}, Shopify规则={'开' if self.canonicalizer.shopify else '关'}, "
+                        f"rel=canonical={'开' if self.canonicalizer.honor_rel_canonical else '关'}")
+        if self.use_sitemaps:
+            logger.info(f"🗺️ 站点地图种子: {', '.join(self.sitemap_urls) or '从robots.txt读取'}")
         if self.path_filter:
             logger.info(f"📁 路径筛选: {self.path_filter}")
             logger.info(f"💡 策略: 首页总是被处理以获取链接，然后对发现的链接应用筛选")
         else:
             logger.info(f"📁 路径筛选: 无（检测所有页面）")
-        logger.info(f"⏱️  请求延迟: {self.delay}秒")
+        if self.rate_limiter is not None:
+            mode = '自适应' if self.rate_limiter.adaptive else '固定'
+            logger.info(f"⏱️  按域名限速: 每秒 {self.rate_limiter.initial_rate} 个请求 ({mode})")
+        else:
+            logger.info(f"⏱️  请求延迟: {self.delay}秒")
         logger.info(f"🎯 起始URL: {start_url}")
-        
-        # 测试起始URL的可访问性
-        logger.info(f"🔍 测试起始URL可访问性...")
-        test_status = self.check_url_status(start_url)
-        logger.info(f"📊 起始URL状态: {test_status}")
-        
-        if test_status == 'ERROR':
-            logger.warning(f"⚠️  起始URL无法访问，请检查网络连接或域名是否正确")
-        
         logger.info("=" * 80)
     
     def _handle_404_page(self, url):
         """处理404页面"""
-        logger.info(f"  ❌ 页面本身就是404: {url}")
+        logger.log(self._detail_level, "  ❌ 页面本身就是404: %s", url)
         with self._lock:
-            self.found_404s.append({
-                'url': url,
-                'found_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'status_code': 404,
-                'parent_page': 'N/A',
-                'matches_filter': self.matches_path_filter(url),
-                'position': '页面本身',
-                'link_text': '',
-                'element_type': 'page',
-                'classes_info': [],
-                'element_id': '',
-                'element_tag': '',
-                'css_selector': '',
-                'xpath': '',
-                'visual_position': '页面本身',
-                'fix_suggestion': '检查页面是否已删除或URL是否正确'
-            })
+            self.found_404s.append(Link404Record(
+                url=url,
+                found_at=int(time.time()),
+                status_code=404,
+                parent_page='N/A',
+                matches_filter=self.matches_path_filter(url),
+                position='页面本身',
+                link_text='',
+                element_type='page',
+                classes=(),
+                element_id='',
+                element_tag='',
+                css_selector='',
+                xpath='',
+                visual_position='页面本身',
+                fix_suggestion='检查页面是否已删除或URL是否正确'
+            ))
+    
+    def _report_path(self, filename):
+        """报告文件路径：设置了 report_dir 时放在该目录下"""
+        if not self.report_dir:
+            return filename
+        os.makedirs(self.report_dir, exist_ok=True)
+        return os.path.join(self.report_dir, filename)
+    
+    def _open_page_details_stream(self, path=None):
+        """打开页面详情的JSON Lines流式文件（断点恢复时以追加方式打开原文件）"""
+        if path is None:
+            domain_safe = self.domain.replace('.', '_').replace('://', '_')
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            path = self._report_path(f"404_pages_{domain_safe}_{timestamp}.jsonl")
+        self.page_details_path = path
+        self._page_details_file = open(path, 'a', encoding='utf-8')
+        logger.info(f"📝 页面详情实时写入: {path}")
+    
+    def _close_page_details_stream(self):
+        """关闭页面详情流式文件"""
+        with self._lock:
+            if self._page_details_file is not None:
+                self._page_details_file.close()
+                self._page_details_file = None
+    
+    def iter_page_details(self):
+        """逐条遍历页面详情：流式模式下从JSON Lines文件读取，内存占用与爬取规模无关"""
+        if not self.stream_reports:
+            yield from self.page_link_details
+            return
+        
+        with self._lock:
+            if self._page_details_file is not None:
+                self._page_details_file.flush()
+        if not self.page_details_path or not os.path.exists(self.page_details_path):
+            return
+        
+        # 断点恢复后同一页面可能被写入两次，只保留第一次
+        seen_pages = set()
+        with open(self.page_details_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    page_detail = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程被强制结束时最后一行可能不完整
+                    continue
+                if page_detail['page_url'] in seen_pages:
+                    continue
+                seen_pages.add(page_detail['page_url'])
+                yield page_detail
+    
+    @staticmethod
+    def _format_classes_info(classes_info):
+        """把class层级信息格式化为多行文本"""
+        class_info_str = ''
+        for class_info in classes_info:
+            class_info_str += f"{class_info['level']}: <{class_info['tag']}> class=\"{class_info['classes']}\"\n"
+        return class_info_str.strip()
     
+    @staticmethod
+    def _styled_header_row(ws, headers):
+        """生成带样式的表头行（write-only模式）"""
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        row = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = Alignment(horizontal="center")
+            row.append(cell)
+        return row
+    
+    @staticmethod
+    def _set_column_widths(ws, widths):
+        """设置列宽（write-only模式下必须在写入数据前设置）"""
+        for col, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+    
+    @timed_phase('report')
     def save_results_to_excel(self):
-        """保存结果到Excel文件"""
+        """保存结果到Excel文件（write-only模式逐行写入，内存占用不随链接数增长）"""
         try:
             # 创建工作簿
-            wb = Workbook()
+            wb = Workbook(write_only=True)
             
             # 404链接汇总表
-            ws_summary = wb.active
-            ws_summary.title = "404链接汇总"
-            
-            # 设置表头
-            headers = [
+            ws_summary = wb.create_sheet("404链接汇总")
+            self._set_column_widths(ws_summary, [50, 20, 10, 50, 15, 25, 40, 40, 30, 15, 15, 20, 60, 40])
+            ws_summary.append(self._styled_header_row(ws_summary, [
                 '404链接', '发现时间', '状态码', '来源页面', '匹配筛选条件', 
                 '可视化位置', 'CSS选择器', 'XPath路径', '链接文本', '元素类型', 
                 '元素标签', '元素ID', 'Class信息', '修复建议'
-            ]
-            
-            # 设置表头样式
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            
-            for col, header in enumerate(headers, 1):
-                cell = ws_summary.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal="center")
+            ]))
             
             # 填充404链接数据
-            for row, link_404 in enumerate(self.found_404s, 2):
-                ws_summary.cell(row=row, column=1, value=link_404['url'])
-                ws_summary.cell(row=row, column=2, value=link_404['found_time'])
-                ws_summary.cell(row=row, column=3, value=link_404['status_code'])
-                ws_summary.cell(row=row, column=4, value=link_404['parent_page'])
-                ws_summary.cell(row=row, column=5, value='是' if link_404['matches_filter'] else '否')
-                ws_summary.cell(row=row, column=6, value=link_404.get('visual_position', ''))
-                ws_summary.cell(row=row, column=7, value=link_404.get('css_selector', ''))
-                ws_summary.cell(row=row, column=8, value=link_404.get('xpath', ''))
-                ws_summary.cell(row=row, column=9, value=link_404['link_text'])
-                ws_summary.cell(row=row, column=10, value=link_404['element_type'])
-                ws_summary.cell(row=row, column=11, value=link_404['element_tag'])
-                ws_summary.cell(row=row, column=12, value=link_404['element_id'])
-                
-                # 格式化class信息
-                class_info_str = ''
-                for class_info in link_404.get('classes_info', []):
-                    class_info_str += f"{class_info['level']}: <{class_info['tag']}> class=\"{class_info['classes']}\"\n"
-                ws_summary.cell(row=row, column=13, value=class_info_str.strip())
-                
-                ws_summary.cell(row=row, column=14, value=link_404.get('fix_suggestion', ''))
-            
-            # 设置列宽
-            column_widths = [50, 20, 10, 50, 15, 25, 40, 40, 30, 15, 15, 20, 60, 40]
-            for col, width in enumerate(column_widths, 1):
-                ws_summary.column_dimensions[ws_summary.cell(row=1, column=col).column_letter].width = width
+            for link_404 in self.found_404s:
+                ws_summary.append([
+                    link_404['url'],
+                    link_404['found_time'],
+                    link_404['status_code'],
+                    link_404['parent_page'],
+                    '是' if link_404['matches_filter'] else '否',
+                    link_404.get('visual_position', ''),
+                    link_404.get('css_selector', ''),
+                    link_404.get('xpath', ''),
+                    link_404['link_text'],
+                    link_404['element_type'],
+                    link_404['element_tag'],
+                    link_404['element_id'],
+                    self._format_classes_info(link_404.get('classes_info', [])),
+                    link_404.get('fix_suggestion', '')
+                ])
             
             # 页面链接详情工作表
             ws_details = wb.create_sheet("页面链接详情")
-            detail_headers = [
+            self._set_column_widths(ws_details, [50, 50, 10, 20, 15, 25, 40, 40, 30, 15, 15, 20, 60])
+            ws_details.append(self._styled_header_row(ws_details, [
                 '页面URL', '链接URL', '状态码', '检查时间', '匹配筛选条件', 
                 '可视化位置', 'CSS选择器', 'XPath路径', '链接文本', '元素类型', 
                 '元素标签', '元素ID', 'Class信息'
-            ]
+            ]))
             
-            # 设置详情表头样式
-            for col, header in enumerate(detail_headers, 1):
-                cell = ws_details.cell(row=1, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal="center")
-            
-            detail_row = 2
-            for page_detail in self.page_link_details:
+            for page_detail in self.iter_page_details():
                 for link_status in page_detail['links_status']:
-                    ws_details.cell(row=detail_row, column=1, value=page_detail['page_url'])
-                    ws_details.cell(row=detail_row, column=2, value=link_status['link_url'])
-                    ws_details.cell(row=detail_row, column=3, value=link_status['status_code'])
-                    ws_details.cell(row=detail_row, column=4, value=link_status['check_time'])
-                    ws_details.cell(row=detail_row, column=5, value='是' if link_status['matches_filter'] else '否')
-                    ws_details.cell(row=detail_row, column=6, value=link_status.get('visual_position', ''))
-                    ws_details.cell(row=detail_row, column=7, value=link_status.get('css_selector', ''))
-                    ws_details.cell(row=detail_row, column=8, value=link_status.get('xpath', ''))
-                    ws_details.cell(row=detail_row, column=9, value=link_status['link_text'])
-                    ws_details.cell(row=detail_row, column=10, value=link_status['element_type'])
-                    ws_details.cell(row=detail_row, column=11, value=link_status.get('element_tag', ''))
-                    ws_details.cell(row=detail_row, column=12, value=link_status.get('element_id', ''))
-                    
-                    # 格式化class信息
-                    class_info_str = ''
-                    for class_info in link_status.get('classes_info', []):
-                        class_info_str += f"{class_info['level']}: <{class_info['tag']}> class=\"{class_info['classes']}\"\n"
-                    ws_details.cell(row=detail_row, column=13, value=class_info_str.strip())
-                    
-                    detail_row += 1
+                    ws_details.append([
+                        page_detail['page_url'],
+                        link_status['link_url'],
+                        link_status['status_code'],
+                        link_status['check_time'],
+                        '是' if link_status['matches_filter'] else '否',
+                        link_status.get('visual_position', ''),
+                        link_status.get('css_selector', ''),
+                        link_status.get('xpath', ''),
+                        link_status['link_text'],
+                        link_status['element_type'],
+                        link_status.get('element_tag', ''),
+                        link_status.get('element_id', ''),
+                        self._format_classes_info(link_status.get('classes_info', []))
+                    ])
             
-            # 设置详情表列宽
-            detail_column_widths = [50, 50, 10, 20, 15, 25, 40, 40, 30, 15, 15, 20, 60]
-            for col, width in enumerate(detail_column_widths, 1):
-                ws_details.column_dimensions[ws_details.cell(row=1, column=col).column_letter].width = width
+            # 重定向链工作表（循环和长链排在前面）
+            redirect_chains = self.sorted_redirect_chains()
+            if redirect_chains:
+                ws_redirects = wb.create_sheet("重定向链")
+                self._set_column_widths(ws_redirects, [50, 10, 12, 100, 15, 50])
+                ws_redirects.append(self._styled_header_row(ws_redirects, [
+                    '链接URL', '跳转次数', '最终状态码', '跳转路径', '问题', '来源页面(示例)'
+                ]))
+                for chain in redirect_chains:
+                    ws_redirects.append([
+                        chain['url'],
+                        chain['redirects'],
+                        chain['final_status'],
+                        self._format_redirect_hops(chain['hops']),
+                        self._redirect_problem(chain),
+                        '\n'.join(chain['parent_pages'])
+                    ])
             
             # 统计信息工作表
             ws_stats = wb.create_sheet("统计信息")
+            self._set_column_widths(ws_stats, [25, 50])
             stats_data = [
                 ['检测域名', self.domain],
                 ['检测时间', datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
@@ -738,17 +3307,18 @@ class Link404Crawler:
                 filtered_404s = [link for link in self.found_404s if link['matches_filter']]
                 stats_data.append(['符合筛选条件的404链接', len(filtered_404s)])
             
-            for row, (key, value) in enumerate(stats_data, 1):
-                ws_stats.cell(row=row, column=1, value=key)
-                ws_stats.cell(row=row, column=2, value=value)
+            if redirect_chains:
+                stats_data.append(['重定向链接数', len(redirect_chains)])
+                stats_data.append(['长重定向链', sum(1 for chain in redirect_chains if chain['long'])])
+                stats_data.append(['循环重定向', sum(1 for chain in redirect_chains if chain['loop'])])
             
-            ws_stats.column_dimensions['A'].width = 25
-            ws_stats.column_dimensions['B'].width = 50
+            for row in stats_data:
+                ws_stats.append(row)
             
             # 保存Excel文件
             domain_safe = self.domain.replace('.', '_').replace('://', '_')
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"404_links_{domain_safe}_{timestamp}.xlsx"
+            filename = self._report_path(f"404_links_{domain_safe}_{timestamp}.xlsx")
             
             wb.save(filename)
             logger.info(f"\n📊 Excel报告已生成: {filename}")
@@ -759,10 +3329,35 @@ class Link404Crawler:
             logger.error(f"❌ 保存Excel文件时出错: {e}")
             return None
     
+    @timed_phase('report')
     def generate_html_report(self):
-        """生成HTML格式的报告"""
+        """生成HTML格式的报告（逐条写入文件，不在内存中拼接整个页面）"""
         try:
-            html_content = f"""
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            domain_safe = self.domain.replace('.', '_').replace('://', '_')
+            filename = self._report_path(f"404_report_{domain_safe}_{timestamp}.html")
+            
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(self._html_report_header())
+                for i, link_404 in enumerate(self.found_404s, 1):
+                    f.write(self._html_report_item(i, link_404))
+                f.write(self._html_redirect_section())
+                f.write("""
+                </div>
+            </body>
+            </html>
+            """)
+            
+            logger.info(f"📄 HTML报告已保存: {filename}")
+            return filename
+            
+        except Exception as e:
+            logger.error(f"生成HTML报告时出错: {e}")
+            return None
+    
+    def _html_report_header(self):
+        """HTML报告头部：样式、基本信息和统计"""
+        return f"""
             <!DOCTYPE html>
             <html>
             <head>
@@ -814,9 +3409,10 @@ class Link404Crawler:
                         </div>
                     </div>
             """
-            
-            for i, link_404 in enumerate(self.found_404s, 1):
-                html_content += f"""
+    
+    def _html_report_item(self, i, link_404):
+        """HTML报告中单个404链接的条目"""
+        return f"""
                 <div class="link-item">
                     <h3>#{i} <span class="url">{link_404['url']}</span></h3>
                     <div class="meta">
@@ -844,61 +3440,158 @@ class Link404Crawler:
                     </div>
                 </div>
                 """
-            
-            html_content += """
+    
+    def _html_redirect_section(self):
+        """HTML报告中的循环重定向和长重定向链列表；没有问题时为空"""
+        flagged = [chain for chain in self.sorted_redirect_chains() if chain['loop'] or chain['long']]
+        if not flagged:
+            return ''
+        items = ''.join(f"""
+                <div class="link-item">
+                    <h3><span class="url">{chain['url']}</span> <span class="tag">{self._redirect_problem(chain)}</span></h3>
+                    <div class="selector"><code>{self._format_redirect_hops(chain['hops'])}</code></div>
+                    {f'<p class="meta"><strong>📄 来源页面:</strong> {", ".join(chain["parent_pages"])}</p>' if chain['parent_pages'] else ''}
                 </div>
-            </body>
-            </html>
-            """
+                """ for chain in flagged)
+        return f"""
+                <h2>🔀 重定向问题 ({len(flagged)})</h2>
+                {items}
+                """
+    
+    def sorted_redirect_chains(self):
+        """按问题严重程度排序的重定向链：循环、长链，然后按跳转次数从多到少"""
+        with self._lock:
+            chains = list(self.redirect_chains.values())
+        return sorted(chains, key=lambda chain: (not chain['loop'], not chain['long'], -chain['redirects'], chain['url']))
+    
+    @staticmethod
+    def _format_redirect_hops(hops):
+        return ' → '.join(f"{hop['url']} ({hop['status_code']})" for hop in hops)
+    
+    @staticmethod
+    def _redirect_problem(chain):
+        if chain['loop']:
+            return '循环重定向'
+        if chain['final_status'] == 'ERROR':
+            return '跳转过多/出错'
+        if chain['long']:
+            return f"长链({chain['redirects']}跳)"
+        return ''
+    
+    @timed_phase('report')
+    def save_json_report(self):
+        """保存JSON格式的详细报告（页面详情逐条写入）"""
+        try:
+            scan_info = {
+                'domain': self.domain,
+                'scan_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'max_pages': self.max_pages,
+                'path_filter': self.path_filter,
+                'total_pages_scanned': len(self.visited_urls),
+                'total_links_found': len(self.all_links),
+                'total_404s_found': len(self.found_404s),
+                'total_redirect_chains': len(self.redirect_chains)
+            }
             
-            # 保存HTML文件
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"404_report_{self.domain.replace('.', '_')}_{timestamp}.html"
+            domain_safe = self.domain.replace('.', '_').replace('://', '_')
+            filename = self._report_path(f"404_data_{domain_safe}_{timestamp}.json")
+            
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+                f.write('{\n  "scan_info": ')
+                f.write(json.dumps(scan_info, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+                f.write(',\n  "found_404s": ')
+                f.write(json.dumps(self.found_404s, ensure_ascii=False, indent=2, default=record_to_json).replace('\n', '\n  '))
+                f.write(',\n  "redirect_chains": ')
+                f.write(json.dumps(self.sorted_redirect_chains(), ensure_ascii=False, indent=2).replace('\n', '\n  '))
+                f.write(',\n  "page_details": [')
+                for i, page_detail in enumerate(self.iter_page_details()):
+                    f.write(',\n    ' if i else '\n    ')
+                    f.write(json.dumps(page_detail, ensure_ascii=False, indent=2, default=record_to_json).replace('\n', '\n    '))
+                f.write('\n  ]\n}\n')
             
-            logger.info(f"📄 HTML报告已保存: {filename}")
+            logger.info(f"📋 JSON数据已保存: {filename}")
             return filename
             
         except Exception as e:
-            logger.error(f"生成HTML报告时出错: {e}")
+            logger.error(f"保存JSON文件时出错: {e}")
             return None
     
-    def save_json_report(self):
-        """保存JSON格式的详细报告"""
+    def build_diff_report(self):
+        """与上一次运行对比，返回新增失效、仍然失效、已修复、状态变化和本次未遇到的链接
+        
+        只有重新检查后返回 2xx/3xx 才算已修复；不再是404但仍不可用（访问错误、500、403等）
+        的链接归入 changed，附带本次的状态码。
+        """
+        previous = self.diff_baseline.broken
+        current = {}
+        for record in self.found_404s:
+            current.setdefault(normalize_url_key(record['url']), []).append(record)
+        
+        diff = {'newly_broken': [], 'still_broken': [], 'fixed': [], 'changed': [], 'not_seen': []}
+        for key, records in current.items():
+            diff['still_broken' if key in previous else 'newly_broken'].extend(records)
+        for key, entry in previous.items():
+            if key in current:
+                continue
+            status = self._diff_observed.get(key)
+            if status is None:
+                # 链接已从页面中移除，或所在页面本次没有被爬取
+                diff['not_seen'].append({'url': entry['url'], 'previous_parent_pages': entry['parent_pages']})
+            else:
+                group = 'fixed' if PreviousRunBaseline._is_ok(status) else 'changed'
+                diff[group].append({'url': entry['url'], 'status_code': status,
+                                    'previous_parent_pages': entry['parent_pages']})
+        return diff
+    
+    @staticmethod
+    def _diff_counts(diff):
+        """各类别的URL数（同一URL出现在多个页面只计一次）"""
+        return {name: len({item['url'] for item in items}) for name, items in diff.items()}
+    
+    @timed_phase('report')
+    def save_diff_report(self):
+        """保存与上一次运行的差异报告（JSON）"""
+        if self.diff_baseline is None:
+            return None
         try:
-            report_data = {
+            diff = self.build_diff_report()
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            domain_safe = self.domain.replace('.', '_').replace('://', '_')
+            filename = self._report_path(f"404_diff_{domain_safe}_{timestamp}.json")
+            data = {
                 'scan_info': {
                     'domain': self.domain,
                     'scan_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'max_pages': self.max_pages,
-                    'path_filter': self.path_filter,
-                    'total_pages_scanned': len(self.visited_urls),
-                    'total_links_found': len(self.all_links),
-                    'total_404s_found': len(self.found_404s)
+                    'baseline': self.diff_baseline.path,
+                    'baseline_broken_links': len(self.diff_baseline.broken),
+                    'reused_statuses': self.diff_baseline.reused,
+                    'total_pages_scanned': len(self.visited_urls)
                 },
-                'found_404s': self.found_404s,
-                'page_details': self.page_link_details
+                'summary': self._diff_counts(diff),
+                **diff
             }
-            
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"404_data_{self.domain.replace('.', '_')}_{timestamp}.json"
-            
             with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"📋 JSON数据已保存: {filename}")
+                json.dump(data, f, ensure_ascii=False, indent=2, default=record_to_json)
+            logger.info(f"🆚 差异报告已保存: {filename}")
             return filename
-            
         except Exception as e:
-            logger.error(f"保存JSON文件时出错: {e}")
+            logger.error(f"保存差异报告时出错: {e}")
             return None
     
     def cleanup(self):
         """清理资源"""
         try:
-            if hasattr(self, 'session'):
+            if hasattr(self, 'session') and self._owns_session:
                 self.session.close()
+            if getattr(self, '_page_details_file', None) is not None:
+                self._close_page_details_stream()
+            if getattr(self, 'status_store', None) is not None:
+                self.status_store.close()
+                self.status_store = None
+            if getattr(self, '_metrics_exporter', None) is not None:
+                self._metrics_exporter.stop()
+                self._metrics_exporter = None
             logger.info("🧹 资源清理完成")
         except Exception as e:
             logger.error(f"清理资源时出错: {e}")
@@ -942,121 +3635,18 @@ class Link404Crawler:
     def _generate_enhanced_css_selector(self, element):
         """生成增强的CSS选择器，优先使用最近的class或id"""
         try:
-            # 首先尝试找到最近的有意义的ID或class
-            current = element
-            selectors = []
-            
-            # 检查当前元素
-            if current.get('id'):
-                return f"#{current['id']}"
-            
-            # 检查当前元素的class
-            classes = current.get('class', [])
-            if classes:
-                # 优先使用有意义的class
-                meaningful_classes = [c for c in classes if len(c) > 2 and not c.startswith('_')]
-                if meaningful_classes:
-                    return f".{meaningful_classes[0]}"
-            
-            # 向上查找父级元素的ID或有意义的class
-            level = 0
-            while current and current.name and level < 3:
-                if current.get('id'):
-                    parent_selector = f"#{current['id']}"
-                    if selectors:
-                        return f"{parent_selector} {' '.join(reversed(selectors))}"
-                    else:
-                        return f"{parent_selector} {element.name}"
-                
-                parent_classes = current.get('class', [])
-                if parent_classes:
-                    meaningful_classes = [c for c in parent_classes if len(c) > 2 and not c.startswith('_')]
-                    if meaningful_classes:
-                        parent_selector = f".{meaningful_classes[0]}"
-                        if selectors:
-                            return f"{parent_selector} {' '.join(reversed(selectors))}"
-                        else:
-                            return f"{parent_selector} {element.name}"
-                
-                # 添加当前标签到选择器路径
-                tag_selector = current.name
-                if current.get('class'):
-                    # 只添加第一个class
-                    tag_selector += f".{current['class'][0]}"
-                selectors.append(tag_selector)
-                
-                current = current.parent
-                level += 1
-            
-            # 如果没有找到ID或有意义的class，返回标签路径
-            return ' > '.join(reversed(selectors[-3:])) if selectors else element.name
-            
+            return self._css_selector_from_chain(self._ancestor_chain(element, {}))
         except Exception:
             return self._generate_css_selector(element)  # 回退到原方法
     
     def _get_nearest_identifier(self, element):
         """获取最近的ID或class标识符"""
-        identifiers = []
-        current = element
-        level = 0
-        
-        while current and current.name and level < 5:
-            # 检查ID
-            if current.get('id'):
-                identifiers.append({
-                    'type': 'id',
-                    'value': current['id'],
-                    'selector': f"#{current['id']}",
-                    'level': level,
-                    'tag': current.name
-                })
-            
-            # 检查有意义的class
-            classes = current.get('class', [])
-            meaningful_classes = [c for c in classes if len(c) > 2 and not c.startswith('_') and not c.isdigit()]
-            
-            for cls in meaningful_classes[:2]:  # 最多取前两个有意义的class
-                identifiers.append({
-                    'type': 'class',
-                    'value': cls,
-                    'selector': f".{cls}",
-                    'level': level,
-                    'tag': current.name
-                })
-            
-            current = current.parent
-            level += 1
-        
-        return identifiers
+        return self._identifiers_from_chain(self._ancestor_chain(element, {}))
     
     def _generate_xpath(self, element):
         """生成XPath路径"""
         try:
-            xpath_parts = []
-            current = element
-            
-            while current and current.name and len(xpath_parts) < 5:
-                tag = current.name
-                
-                # 如果有ID，使用ID定位
-                if current.get('id'):
-                    xpath_parts.append(f"//{tag}[@id='{current['id']}']")
-                    break
-                
-                # 计算同级元素中的位置
-                siblings = [s for s in current.parent.children if hasattr(s, 'name') and s.name == tag] if current.parent else []
-                if len(siblings) > 1:
-                    index = siblings.index(current) + 1
-                    xpath_parts.append(f"{tag}[{index}]")
-                else:
-                    xpath_parts.append(tag)
-                
-                current = current.parent
-            
-            if xpath_parts:
-                return '/' + '/'.join(reversed(xpath_parts))
-            return ''
-            
+            return self._xpath_from_chain(self._ancestor_chain(element, {}))
         except Exception:
             return ''
     
@@ -1145,6 +3735,44 @@ class Link404Crawler:
         
         return '; '.join(suggestions[:4])  # 返回前4个建议
 
+# 解析进程返回的紧凑链接记录: (链接URL, *POSITION_FIELDS)
+POSITION_FIELDS = (
+    'position', 'text', 'element_type', 'classes_info', 'element_id', 'element_tag',
+    'css_selector', 'xpath', 'visual_position', 'identifiers'
+)
+
+_worker_crawler = None
+
+
+def _init_parse_worker(domain, path_filter, html_parser, canonicalization=None):
+    """解析进程初始化：创建只用于解析的爬虫实例"""
+    global _worker_crawler
+    logger.setLevel(logging.WARNING)
+    _worker_crawler = Link404Crawler(domain, path_filter=path_filter, html_parser=html_parser,
+                                     use_status_cache=False, canonicalization=canonicalization)
+
+
+def _parse_page_in_worker(content, base_url):
+    """在解析进程中提取页面链接，返回 (标题, rel=canonical地址, [(链接URL, *位置字段), ...])"""
+    links = set()
+    link_positions = {}
+    title, canonical = _worker_crawler._parse_page_links(content, base_url, links, link_positions)
+    records = [
+        (link_url,) + tuple(link_positions[link_url][field] for field in POSITION_FIELDS)
+        for link_url in links
+    ]
+    return title, canonical, records
+
+
+# 路径筛选预设（交互式配置的选项 2-5；批量检测时可以按名称引用）
+PATH_FILTER_PRESETS = {
+    'au': '/au',
+    'products': '/products',
+    'support': '/support',
+    'blog': '/blog',
+}
+
+
 def load_config_from_file(config_file="config.json"):
     """从配置文件加载配置"""
     try:
@@ -1180,7 +3808,31 @@ def get_user_config():
             'path_filter': path_filter,  # 使用 route 或 path_filter
             'max_pages': config_data.get('max_pages', 50),
             'max_workers': config_data.get('max_workers', 5),
-            'delay': config_data.get('delay', 1.0)
+            'delay': config_data.get('delay', 1.0),
+            'engine': config_data.get('engine', 'sync'),
+            'max_inflight_pages': config_data.get('max_inflight_pages'),
+            'use_status_cache': config_data.get('use_status_cache', True),
+            'status_store_path': config_data.get('status_store_path'),
+            'status_ttl': config_data.get('status_ttl', 86400),
+            'frontier_priority': config_data.get('frontier_priority'),
+            'use_bloom_filter': config_data.get('use_bloom_filter', False),
+            'rate_limit': config_data.get('rate_limit'),
+            'adaptive_rate': config_data.get('adaptive_rate', True),
+            'html_parser': config_data.get('html_parser'),
+            'lazy_link_metadata': config_data.get('lazy_link_metadata', False),
+            'stream_reports': config_data.get('stream_reports', False),
+            'revalidate_pages': config_data.get('revalidate_pages', True),
+            'parse_workers': config_data.get('parse_workers', 0),
+            'use_sitemaps': config_data.get('use_sitemaps', False),
+            'sitemap_urls': config_data.get('sitemap_urls'),
+            'canonicalization': config_data.get('canonicalization'),
+            'metrics_path': config_data.get('metrics_path'),
+            'metrics_interval': config_data.get('metrics_interval', 10),
+            'metrics_port': config_data.get('metrics_port'),
+            'log_mode': config_data.get('log_mode', 'verbose'),
+            'log_every': config_data.get('log_every', 50),
+            'diff_baseline': config_data.get('diff_baseline'),
+            'long_redirect_chain': config_data.get('long_redirect_chain', 2)
         }
         print("\n✅ 使用配置文件中的配置")
         
@@ -1191,6 +3843,7 @@ def get_user_config():
         print(f"📄 最大页面数: {config['max_pages']}")
         print(f"🔄 并发线程数: {config['max_workers']}")
         print(f"⏱️ 请求延迟: {config['delay']}秒")
+        print(f"⚙️ 爬取引擎: {config['engine']}")
         
         confirm = input("\n✅ 确认开始检测？(y/n，默认y): ").strip().lower()
         if confirm in ['n', 'no']:
@@ -1235,13 +3888,13 @@ def get_interactive_config():
     
     path_filter = None
     if filter_choice == 2:
-        path_filter = '/au'
+        path_filter = PATH_FILTER_PRESETS['au']
     elif filter_choice == 3:
-        path_filter = '/products'
+        path_filter = PATH_FILTER_PRESETS['products']
     elif filter_choice == 4:
-        path_filter = '/support'
+        path_filter = PATH_FILTER_PRESETS['support']
     elif filter_choice == 5:
-        path_filter = '/blog'
+        path_filter = PATH_FILTER_PRESETS['blog']
     elif filter_choice == 6:
         custom_path = input("\n请输入自定义路径 (例如: /au, /category): ").strip()
         if custom_path:
@@ -1308,24 +3961,126 @@ def get_interactive_config():
         'path_filter': path_filter,
         'max_pages': max_pages,
         'max_workers': max_workers,
-        'delay': delay
+        'delay': delay,
+        'engine': 'sync',
+        'max_inflight_pages': None,
+        'use_status_cache': True,
+        'status_store_path': None,
+        'status_ttl': 86400,
+        'frontier_priority': None,
+        'use_bloom_filter': False,
+        'rate_limit': None,
+        'adaptive_rate': True,
+        'html_parser': None,
+        'lazy_link_metadata': False,
+        'stream_reports': False,
+        'revalidate_pages': True,
+        'parse_workers': 0,
+        'use_sitemaps': False,
+        'sitemap_urls': None,
+        'canonicalization': None,
+        'metrics_path': None,
+        'metrics_interval': 10,
+        'metrics_port': None,
+        'log_mode': 'verbose',
+        'log_every': 50,
+        'diff_baseline': None,
+        'long_redirect_chain': 2
+    }
+
+def crawler_kwargs_from_config(config, **overrides):
+    """把配置字典转换为 Link404Crawler 的构造参数（不含断点相关参数）"""
+    kwargs = {
+        'domain': config['domain'],
+        'max_pages': config['max_pages'],
+        'delay': config['delay'],
+        'path_filter': config['path_filter'],
+        'max_workers': config['max_workers'],
+        'engine': config.get('engine', 'sync'),
+        'max_inflight_pages': config.get('max_inflight_pages'),
+        'use_status_cache': config.get('use_status_cache', True),
+        'status_store_path': config.get('status_store_path'),
+        'status_ttl': config.get('status_ttl', 86400),
+        'frontier_priority': config.get('frontier_priority'),
+        'use_bloom_filter': config.get('use_bloom_filter', False),
+        'rate_limit': config.get('rate_limit'),
+        'adaptive_rate': config.get('adaptive_rate', True),
+        'html_parser': config.get('html_parser'),
+        'lazy_link_metadata': config.get('lazy_link_metadata', False),
+        'stream_reports': config.get('stream_reports', False),
+        'revalidate_pages': config.get('revalidate_pages', True),
+        'parse_workers': config.get('parse_workers', 0),
+        'use_sitemaps': config.get('use_sitemaps', False),
+        'sitemap_urls': config.get('sitemap_urls'),
+        'canonicalization': config.get('canonicalization'),
+        'metrics_path': config.get('metrics_path'),
+        'metrics_interval': config.get('metrics_interval', 10),
+        'metrics_port': config.get('metrics_port'),
+        'log_mode': config.get('log_mode', 'verbose'),
+        'log_every': config.get('log_every', 50),
+        'diff_baseline': config.get('diff_baseline'),
+        'long_redirect_chain': config.get('long_redirect_chain', 2)
     }
+    kwargs.update(overrides)
+    return kwargs
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='404链接检测工具')
+    parser.add_argument('--resume', action='store_true',
+                        help='从上次保存的断点继续爬取')
+    parser.add_argument('--checkpoint', default=None,
+                        help='断点文件路径（默认: crawl_checkpoint_<域名>.json）')
+    parser.add_argument('--checkpoint-interval', type=int, default=None,
+                        help='每爬取多少个页面保存一次断点（默认50）')
+    parser.add_argument('--sitemap', action='store_true',
+                        help='从robots.txt声明的站点地图加载URL作为爬取种子')
+    parser.add_argument('--metrics-file', default=None,
+                        help='定期把运行指标（阶段耗时、请求数、队列深度）写入此JSON文件')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='在本机端口提供 /metrics（Prometheus格式）和 /metrics.json')
+    parser.add_argument('--quiet', action='store_true',
+                        help='精简日志：不逐页/逐个404输出详情，只显示进度和最终统计')
+    parser.add_argument('--log-every', type=int, default=None,
+                        help='精简日志且输出不是终端时，每隔多少页输出一行进度（默认50）')
+    parser.add_argument('--debug', action='store_true',
+                        help='输出DEBUG级别日志（配合 --quiet 可查看被降级的详细信息）')
+    parser.add_argument('--diff', default=None, metavar='PATH',
+                        help='增量检测：与上次的JSON报告或持久化存储(.db)对比，只检查上次失效的链接和新链接')
+    return parser.parse_args()
 
 def main():
     """主函数"""
+    args = parse_args()
+    if args.debug:
+        logger.setLevel(logging.DEBUG)
     try:
         # 获取用户配置
         config = get_user_config()
         if not config:
             return
         
+        # 断点文件默认按域名区分，确保中断后可以 --resume 继续
+        checkpoint_path = args.checkpoint or config.get('checkpoint_path')
+        if not checkpoint_path:
+            domain_safe = config['domain'].replace('.', '_').replace('://', '_').replace('/', '_')
+            checkpoint_path = f"crawl_checkpoint_{domain_safe}.json"
+        checkpoint_interval = args.checkpoint_interval or config.get('checkpoint_interval', 50)
+        
         # 创建爬虫实例并开始检测
         with Link404Crawler(
-            domain=config['domain'],
-            max_pages=config['max_pages'],
-            delay=config['delay'],
-            path_filter=config['path_filter'],
-            max_workers=config['max_workers']
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=checkpoint_interval,
+            resume=args.resume,
+            **crawler_kwargs_from_config(
+                config,
+                use_sitemaps=args.sitemap or config.get('use_sitemaps', False),
+                metrics_path=args.metrics_file or config.get('metrics_path'),
+                metrics_port=args.metrics_port if args.metrics_port is not None else config.get('metrics_port'),
+                log_mode='quiet' if args.quiet else config.get('log_mode', 'verbose'),
+                log_every=args.log_every or config.get('log_every', 50),
+                diff_baseline=args.diff or config.get('diff_baseline')
+            )
         ) as crawler:
             
             # 开始爬取
@@ -1346,6 +4101,9 @@ def main():
             # 保存JSON数据
             json_file = crawler.save_json_report()
             
+            # 增量检测时另存差异报告
+            diff_file = crawler.save_diff_report()
+            
             print("\n🎉 检测完成！生成的文件:")
             if excel_file:
                 print(f"📊 Excel报告: {excel_file}")
@@ -1353,12 +4111,17 @@ def main():
                 print(f"📄 HTML报告: {html_file}")
             if json_file:
                 print(f"📋 JSON数据: {json_file}")
+            if diff_file:
+                print(f"🆚 差异报告: {diff_file}")
+            if crawler.page_details_path:
+                print(f"📝 页面详情(JSON Lines): {crawler.page_details_path}")
                 
             if not crawler.found_404s:
                 print("\n🎉 太棒了！没有发现404链接！")
                 
     except KeyboardInterrupt:
         print("\n\n⚠️ 用户中断检测")
+        print("💡 已保存断点，使用 --resume 参数可继续本次检测")
     except Exception as e:
         logger.error(f"程序执行出错: {e}")
         print(f"\n❌ 程序执行出错: {e}")
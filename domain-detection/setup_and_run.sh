@@ -98,7 +98,7 @@ echo "🎯 启动404链接检测器..."
 echo "==========================================="
 
 # 直接运行主程序（配置通过config.json文件读取）
-python3 find_404_links.py
+python3 find_404_links.py "$@"
 
 echo ""
 echo "🎉 404链接检测完成！"